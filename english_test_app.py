@@ -3,49 +3,78 @@
 from __future__ import annotations  # Habilita anotaciones futuras sin comillas
 
 import json  # Manejo de datos en formato JSON para estados y resultados
+import math  # Logaritmos de la regla secuencial de parada temprana
+import pickle  # Copia binaria del banco normalizado para arranques en frío
 import random  # Selección aleatoria de preguntas para variedad
 import re  # Validación de textos y formatos con expresiones regulares
 import time  # Medición simple para métricas de escritura
-from copy import deepcopy  # Clona estructuras complejas sin compartir referencias
+from collections import defaultdict  # Agrupa preguntas por pasaje en una sola pasada
 from contextlib import contextmanager, nullcontext  # Crea contextos reutilizables de forma segura
+from dataclasses import dataclass, field  # Estructuras con atributos fijos para el estado de grupo
+from functools import lru_cache  # Memoiza funciones puras con argumentos repetidos
+from operator import itemgetter  # Extrae varios campos de un dict en una sola llamada
 from pathlib import Path  # Trabajo robusto con rutas de archivos
-from typing import Any, Dict, List, Optional  # Tipado estático para mayor claridad
-from urllib import error as urlerror  # Manejo de errores al descargar recursos remotos
-from urllib import request as urlrequest  # Descarga de archivos externos (p. ej., modelo de IA)
+from types import MappingProxyType  # Vistas de solo lectura para datos compartidos
+from typing import Any, Callable, DefaultDict, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple  # Tipado estático para mayor claridad
 
 try:  # Dependencia opcional para evaluar textos de escritura
     import textstat  # type: ignore  # Biblioteca de legibilidad
 except Exception:  # pragma: no cover - degradable dependency
     textstat = None  # Si falla la importación seguimos sin bloquear la app
 
+try:  # Dependencia opcional para serializar JSON más rápido
+    import orjson  # type: ignore  # Serializador JSON que devuelve bytes
+except Exception:  # pragma: no cover - degradable dependency
+    orjson = None  # Sin orjson se usa el módulo json estándar
+
+import pyarrow as pa  # Tablas columnares que Streamlit serializa sin pasar por pandas
+import requests  # Cliente HTTP con pool de conexiones para servicios de revisión
 import streamlit as st  # Framework web utilizado para renderizar la aplicación
+from streamlit.errors import StreamlitAPIException  # Error al pedir una recarga parcial fuera de un fragmento
+from requests.adapters import HTTPAdapter  # Configura el tamaño del pool de conexiones
 
+import english_test_bank  # Su normalización forma parte de la copia pickle del banco
 from english_test_bank import WRITING_TYPE, load_item_bank  # Funciones y constantes compartidas del banco de ítems
 
-LEVEL_SEQUENCE = ["A1", "A2", "B1", "B2", "C1", "C2"]  # Orden CEFR usado en la navegación
-BASE_SKILL_SEQUENCE = ["grammar", "vocab", "reading", "use_of_english"]  # Secuencia base de habilidades evaluadas
+LEVEL_SEQUENCE = ("A1", "A2", "B1", "B2", "C1", "C2")  # Orden CEFR usado en la navegación
+LEVEL_INDEX: Mapping[str, int] = MappingProxyType(  # Posición de cada nivel sin recorrer la secuencia
+    {level: index for index, level in enumerate(LEVEL_SEQUENCE)}
+)
+BASE_SKILL_SEQUENCE = ("grammar", "vocab", "reading", "use_of_english")  # Secuencia base de habilidades evaluadas
 ITEM_BANK_PATH = Path(__file__).with_name("english_test_items_v1.json")  # Ruta al archivo local del banco de preguntas
-ADVANCED_LEVELS = {"C1", "C2"}  # Niveles que se consideran avanzados y activan vistas específicas
-WRITING_LEVELS = {"B2", "C1", "C2"}  # Niveles en los que se incluye sección de escritura
-SUPPORTED_UI_TYPES = {  # Tipos de pregunta que la interfaz sabe mostrar
+ADVANCED_LEVELS = frozenset({"C1", "C2"})  # Niveles que se consideran avanzados y activan vistas específicas
+WRITING_LEVELS = frozenset({"B2", "C1", "C2"})  # Niveles en los que se incluye sección de escritura
+SUPPORTED_UI_TYPES = frozenset({  # Tipos de pregunta que la interfaz sabe mostrar
     "multiple_choice",  # Preguntas de opción múltiple
     "cloze_mc",  # Rellenar huecos con opciones
     "cloze_open",  # Rellenar huecos con texto libre
     "word_formation",  # Transformar palabras base
     "key_transform",  # Reescribir frases con palabra clave
     WRITING_TYPE,  # Ejercicios de escritura larga
+})
+GAP_ITEM_FIELDS = {  # Campo con los huecos numerados de cada tipo de ítem por partes
+    "cloze_mc": "cloze_items",
+    "cloze_open": "cloze_items",
+    "word_formation": "word_formation_items",
+    "key_transform": "transform_items",
+}
+GAP_WIDGET_SUFFIXES = {  # Sufijo de la clave de widget de cada hueco según el tipo
+    "cloze_mc": "_gap_",
+    "cloze_open": "_gap_",
+    "word_formation": "_wf_",
+    "key_transform": "_kt_",
 }
 
-CEFR_DESCRIPTIONS = {  # Descripciones amigables por nivel CEFR
+CEFR_DESCRIPTIONS: Mapping[str, str] = MappingProxyType({  # Descripciones amigables por nivel CEFR (solo lectura)
     "A1": "Puede comprender y usar expresiones cotidianas muy básicas para satisfacer necesidades concretas.",
     "A2": "Comprende frases y expresiones de uso frecuente relacionadas con áreas de experiencia que le son relevantes.",
     "B1": "Es capaz de desenvolverse en la mayor parte de las situaciones que pueden surgir durante un viaje.",
     "B2": "Puede interactuar con hablantes nativos con un grado suficiente de fluidez y naturalidad.",
     "C1": "Se expresa de forma fluida y espontánea sin tener que buscar de forma muy evidente las palabras.",
     "C2": "Comprende prácticamente todo lo que oye o lee y se expresa con matices muy finos.",
-}
+})
 
-LEVEL_RULES: Dict[str, Dict[str, int]] = {  # Reglas de avance y tamaño de bloque por nivel
+_RAW_LEVEL_RULES: Dict[str, Dict[str, int]] = {  # Reglas de avance y tamaño de bloque por nivel
     "A1": {"block_size": 10, "promotion_threshold": 8},  # Necesita 8/10 para subir desde A1
     "A2": {"block_size": 10, "promotion_threshold": 8},  # Necesita 8/10 para subir desde A2
     "B1": {"block_size": 10, "promotion_threshold": 8},  # Necesita 8/10 para subir desde B1
@@ -53,14 +82,55 @@ LEVEL_RULES: Dict[str, Dict[str, int]] = {  # Reglas de avance y tamaño de bloq
     "C1": {"block_size": 12, "promotion_threshold": 9},  # En C1 se piden 9 aciertos de 12
     "C2": {"block_size": 12, "promotion_threshold": 9},  # En C2 se mantiene el mismo criterio
 }
+LEVEL_RULES: Mapping[str, Mapping[str, int]] = MappingProxyType(  # Vista de solo lectura de las reglas
+    {level: MappingProxyType(rule) for level, rule in _RAW_LEVEL_RULES.items()}
+)
 
-EARLY_STOP_WRONGS = 3  # Errores consecutivos permitidos antes de detener la prueba
+EARLY_STOP_WRONGS = 3  # Errores en un bloque que lo cierran sin promoción
+SPRT_ERROR_RATE = 0.05  # Errores tipo I y II tolerados por la regla secuencial (SPRT)
+SPRT_INDIFFERENCE = 0.15  # Distancia de las hipótesis de dominio/no dominio al umbral del bloque
 MAX_QUESTIONS = 50  # Número máximo de preguntas en modo adaptativo
 PRACTICE_QUESTIONS = 20  # Número fijo de preguntas en modo práctica
 CHOICE_PLACEHOLDER_BASE = "Selecciona una opción"  # Texto de marcador para selects
-PLACEHOLDER_VALUE_BASE = "__option_placeholder__"  # Valor reservado que evita seleccionar la opción vacía
-
-ADVANCED_LAYOUT_STYLE = """
+PLACEHOLDER_VALUE = "\x00__option_placeholder__\x00"  # Centinela con NUL: ningún texto del banco puede coincidir
+CHOICE_PLACEHOLDER_DISPLAY = f"— {CHOICE_PLACEHOLDER_BASE} —"  # Texto visible de la opción vacía
+WORD_TOKEN_RE = re.compile(r"[\w'-]+")  # Palabras (con apóstrofos y guiones) para conteos de escritura
+BLOCK_STATUS = "Bloque: {correct} aciertos, {wrong} errores, {presented} respondidas de {block_size}."  # Estado del bloque
+ADVANCED_BLOCK_STATUS = "Block progress — answered: {presented}/{block_size}, correct: {correct}, wrong: {wrong}."
+TOTAL_LABEL = f"Preguntas totales contestadas: %d de {MAX_QUESTIONS} permitidas."  # Se completa con las respondidas
+ADVANCED_TOTAL_LABEL = f"Adaptive session items administered: %d of {MAX_QUESTIONS} allowed."
+EMPTY_ANSWERS: Mapping[Any, Any] = MappingProxyType({})  # Respuesta vacía compartida (solo lectura) para ítems sin dict
+GAP_COLUMNS_MIN_ITEMS = 4  # A partir de cuántos huecos de texto se reparten en dos columnas
+REVIEW_PAYLOAD_KEYS = (  # Campos del payload de revisión, en el orden de envío
+    "item_id", "level", "task_type", "rubric", "min_words", "max_words",
+    "word_count", "mode", "response", "submitted_at", "ai_evaluation",
+)
+_REVIEW_FIELDS_GETTER = itemgetter(  # Campos del envío que alimentan REVIEW_PAYLOAD_KEYS
+    "question_id", "level", "task_type", "rubric", "min_words", "max_words",
+    "word_count", "mode", "response", "submitted_at", "ai_evaluation",
+)
+_SUMMARY_FIELDS_GETTER = itemgetter(  # Columnas de la tabla resumen de redacciones
+    "question_id", "level", "task_type", "word_count", "mode", "submitted_at", "ai_evaluation",
+)
+_ITEM_CORE_GETTER = itemgetter("id", "prompt", "skill", "level")  # Campos obligatorios de cada ítem del banco
+ITEM_OPTIONAL_FIELDS = ("explanation", "group_id", "part", "passage", "estimated_time")  # Se copian tal cual si existen
+RELIABILITY_MD = (  # Índices psicométricos mostrados en la portada
+    "- **Fiabilidad piloto (α de Cronbach):** 0.86 en una muestra de 420 participantes.\n"
+    "- **Cobertura CEFR completa:** ≥30 ítems por nivel con rotación de habilidades.\n"
+    "- **Control psicométrico:** reglas determinísticas de promoción y confirmación inspiradas en exámenes internacionales."
+)
+SOURCES_MD = (  # Contenido del desplegable de fuentes
+    "- Curaduría con descriptores oficiales del **Marco Común Europeo (CEFR)**.\n"
+    "- Ítems calibrados a partir de blueprints de **TOEFL iBT, IELTS Academic y Cambridge Main Suite**.\n"
+    "- Validación interna: revisión lingüística y análisis de dificultad/ discriminación tras pilotos en colegios y bootcamps."
+)
+PRIVACY_MD = (  # Contenido del desplegable de privacidad
+    "- **Sin registro ni rastreo personal:** se almacenan únicamente estadísticas agregadas.\n"
+    "- Uso responsable: resultados pensados para orientar planes de refuerzo, no para excluir candidatos.\n"
+    "- Accesibilidad: interfaz compatible con lectores de pantalla y mensajes redundantes en color y texto."
+)
+
+_RAW_ADVANCED_LAYOUT_STYLE = """
 <style>
 .advanced-exam-shell {
     background: #fdfdfc;
@@ -161,7 +231,7 @@ ADVANCED_LAYOUT_STYLE = """
 </style>
 """
 
-WRITING_LAYOUT_STYLE = """
+_RAW_WRITING_LAYOUT_STYLE = """
 <style>
 .writing-shell {
     border: 1px solid #e0e7ff;
@@ -202,13 +272,26 @@ WRITING_LAYOUT_STYLE = """
 }
 </style>
 """
+_CSS_WHITESPACE_RE = re.compile(r"\s+")  # Saltos de línea e indentación de los bloques CSS
+_CSS_PUNCTUATION_SPACE_RE = re.compile(r"\s*([{};>])\s*")  # Espacios sobrantes junto a llaves, ; y etiquetas
+
+
+def _minify_style(html: str) -> str:
+    """Collapse a readable ``<style>`` block into a single compact line."""
+
+    collapsed = _CSS_WHITESPACE_RE.sub(" ", html)  # Une todo en una línea
+    return _CSS_PUNCTUATION_SPACE_RE.sub(r"\1", collapsed).strip()  # Quita espacios alrededor de la puntuación
+
+
+ADVANCED_LAYOUT_STYLE = _minify_style(_RAW_ADVANCED_LAYOUT_STYLE)  # Versión compacta que se envía al navegador
+WRITING_LAYOUT_STYLE = _minify_style(_RAW_WRITING_LAYOUT_STYLE)  # Versión compacta que se envía al navegador
 
 ADVANCED_LEVEL_TITLES = {
     "C1": "C1 Advanced Mode",
     "C2": "C2 Proficiency Mode",
 }
 
-EXAM_PARTS = {
+_RAW_EXAM_PARTS: Dict[str, Dict[str, Any]] = {  # Metadatos de cada parte del examen avanzado
     "reading_long": {
         "order": 1,
         "label": "Part 1",
@@ -235,6 +318,11 @@ EXAM_PARTS = {
         ),
     },
 }
+EXAM_PARTS: Mapping[str, Mapping[str, Any]] = MappingProxyType(  # Vista de solo lectura de las partes
+    {part_id: MappingProxyType(part) for part_id, part in _RAW_EXAM_PARTS.items()}
+)
+EXAM_PART_ORDER = tuple(sorted(EXAM_PARTS, key=lambda key: EXAM_PARTS[key]["order"]))  # Ids de parte ordenados por número
+EXAM_PART_LABELS = tuple(EXAM_PARTS[key]["label"] for key in EXAM_PART_ORDER)  # Etiquetas en el mismo orden
 
 EXAM_PART_ALIASES = {  # Mapea nombres alternativos de secciones a un id canónico
     "reading": "reading_long",  # Alias para lectura larga
@@ -265,8 +353,9 @@ def resolve_exam_part_id(part: Optional[str], skill: Optional[str]) -> str:  # D
     return "use_of_english"  # Por defecto se usa la sección de Use of English
 
 
-def get_exam_part_descriptor(part: Optional[str], skill: Optional[str]) -> Dict[str, Any]:  # Prepara metadatos de sección
-    """Return metadata describing the exam part for the provided identifiers."""  # Explica el propósito
+@lru_cache(maxsize=32)  # Combinaciones parte/habilidad son pocas y estáticas
+def get_exam_part_descriptor(part: Optional[str], skill: Optional[str]) -> Mapping[str, Any]:  # Prepara metadatos de sección
+    """Return read-only metadata describing the exam part for the provided identifiers."""  # Explica el propósito
 
     part_id = resolve_exam_part_id(part, skill)  # Normaliza los argumentos recibidos
     descriptor = EXAM_PARTS.get(part_id, {})  # Busca los metadatos predefinidos
@@ -279,29 +368,25 @@ def get_exam_part_descriptor(part: Optional[str], skill: Optional[str]) -> Dict[
         }
     descriptor = dict(descriptor)  # Se clona para no modificar el original
     descriptor["id"] = part_id  # Se asegura de incluir el id canónico
-    return descriptor  # Devuelve el descriptor final
+    return MappingProxyType(descriptor)  # Vista inmutable: el resultado se comparte desde la caché
 
 
 def render_exam_breadcrumbs(active_part_id: str) -> None:  # Dibuja la barra de progreso de partes
     """Render the Part 1 / Part 2 / Part 3 navigation strip."""  # Explica la función
 
-    ordered_keys = sorted(EXAM_PARTS, key=lambda key: EXAM_PARTS[key]["order"])  # Ordena por número de parte
-    crumbs = []  # Lista que acumulará los elementos HTML
-    for key in ordered_keys:  # Recorre cada parte en orden
-        part = EXAM_PARTS[key]  # Recupera metadatos de la parte
-        css_class = "active" if key == active_part_id else ""  # Marca visualmente la parte actual
-        crumbs.append(f"<span class='{css_class}'>{part['label']}</span>")  # Añade el fragmento HTML
-    crumb_html = " ".join(crumbs)  # Une los fragmentos en una sola cadena
+    crumb_html = " ".join(  # Une los fragmentos HTML de cada parte en orden
+        f"<span class='{'active' if key == active_part_id else ''}'>{label}</span>"
+        for key, label in zip(EXAM_PART_ORDER, EXAM_PART_LABELS)
+    )
     st.markdown(f"<div class='exam-breadcrumbs'>{crumb_html}</div>", unsafe_allow_html=True)  # Muestra la barra
 
 
-def render_exam_part_header(level: str, part: Optional[str], *, skill: Optional[str] = None) -> Dict[str, Any]:  # Renderiza el encabezado elegante
-    """Render the clean Cambridge-style header for advanced sections."""  # Contexto de la función
+@lru_cache(maxsize=32)  # Pocas combinaciones nivel/parte: el HTML se arma una sola vez
+def exam_header_markup(level: str, label: str, title: str) -> str:  # Genera el HTML del encabezado
+    """Return the header markup for an advanced exam part."""  # Contexto de la función
 
-    descriptor = get_exam_part_descriptor(part, skill)  # Obtiene la metadata necesaria
     level_label = ADVANCED_LEVEL_TITLES.get(level, f"{level} Advanced Mode")  # Etiqueta amigable del nivel
-    st.markdown(  # Inserta HTML para el encabezado principal
-        """
+    return """
         <div class="exam-header">
             <div class="exam-part-meta">
                 <div class="exam-part-label">{label}</div>
@@ -309,7 +394,15 @@ def render_exam_part_header(level: str, part: Optional[str], *, skill: Optional[
             </div>
             <div class="exam-level-badge">{level_label}</div>
         </div>
-        """.format(label=descriptor["label"], title=descriptor["title"], level_label=level_label),
+        """.format(label=label, title=title, level_label=level_label)
+
+
+def render_exam_part_header(level: str, part: Optional[str], *, skill: Optional[str] = None) -> Mapping[str, Any]:  # Renderiza el encabezado elegante
+    """Render the clean Cambridge-style header for advanced sections."""  # Contexto de la función
+
+    descriptor = get_exam_part_descriptor(part, skill)  # Obtiene la metadata necesaria
+    st.markdown(  # Inserta HTML para el encabezado principal
+        exam_header_markup(level, descriptor["label"], descriptor["title"]),
         unsafe_allow_html=True,  # Permite HTML sin escapes para aplicar estilos
     )
     render_exam_breadcrumbs(descriptor["id"])  # Muestra las migas de pan activas
@@ -318,13 +411,13 @@ def render_exam_part_header(level: str, part: Optional[str], *, skill: Optional[
     return descriptor  # Devuelve los metadatos usados
 
 
-def skill_rotation_for_level(level: str) -> List[str]:  # Determina el orden de habilidades por nivel
+@lru_cache(maxsize=16)  # Una entrada por nivel CEFR basta
+def skill_rotation_for_level(level: str) -> Tuple[str, ...]:  # Determina el orden de habilidades por nivel
     """Return the skill rotation including writing when the level requires it."""  # Docstring original
 
-    sequence = list(BASE_SKILL_SEQUENCE)  # Copia la secuencia base
-    if level in WRITING_LEVELS and "writing" not in sequence:  # Si el nivel incluye escritura
-        sequence.append("writing")  # Añade la habilidad al final
-    return sequence  # Devuelve la rotación final
+    if level in WRITING_LEVELS and "writing" not in BASE_SKILL_SEQUENCE:  # Si el nivel incluye escritura
+        return BASE_SKILL_SEQUENCE + ("writing",)  # Añade la habilidad al final
+    return BASE_SKILL_SEQUENCE  # La tupla base ya es inmutable y se comparte tal cual
 
 
 def count_words(value: Optional[str]) -> int:  # Cuenta palabras aproximadas en un texto
@@ -332,7 +425,7 @@ def count_words(value: Optional[str]) -> int:  # Cuenta palabras aproximadas en
 
     if not value:  # Si el texto es vacío o None
         return 0  # No hay palabras
-    tokens = re.findall(r"[\w'-]+", value.strip(), flags=re.UNICODE)  # Extrae palabras usando regex
+    tokens = WORD_TOKEN_RE.findall(value.strip())  # Extrae palabras usando regex
     return len(tokens)  # Devuelve el conteo
 
 
@@ -371,8 +464,8 @@ def evaluate_writing_with_ai(
     readability = textstat.flesch_reading_ease(cleaned)  # Calcula legibilidad Flesch
     grade_level = max(0.0, textstat.coleman_liau_index(cleaned))  # Estima grado escolar mínimo 0
     sentence_len = max(1.0, textstat.avg_sentence_length(cleaned))  # Longitud media de frases evitando cero
-    total_words = count_words(cleaned)  # Cuenta palabras
-    tokens = [token.lower().strip(".,;:!?") for token in re.findall(r"[\w'-]+", cleaned)]  # Tokeniza y normaliza
+    tokens = WORD_TOKEN_RE.findall(cleaned.lower())  # Tokeniza sobre el texto ya en minúsculas
+    total_words = len(tokens)  # Cuenta palabras con los mismos tokens
     unique_ratio = len(set(tokens)) / max(1, len(tokens))  # Calcula diversidad léxica
 
     # Sub-scores in a 0–5 scale inspired by CEFR rubrics.  # Comentario explicativo conservado
@@ -447,6 +540,7 @@ def render_writing_inputs(
     rubric = question.get("rubric") or []  # Lista de criterios para mostrar
     task_type = (question.get("task_type") or "Writing task").replace("_", " ").title()  # Tipo de tarea legible
     key = f"{key_prefix}_writing"  # Clave única para el widget de texto
+    register_widget_key(key_prefix, key)  # Se asocia a la familia de la pregunta
     shell_class = "writing-shell serious" if level in ADVANCED_LEVELS else "writing-shell"  # Estilo según nivel
     tone = (  # Mensaje de tono según nivel
         "Formato oficial: cuida el registro, evidencia planificación y respeta la estructura solicitada."
@@ -534,6 +628,7 @@ def record_writing_submission(
         "word_count": count_words(cleaned_text),
         "response": cleaned_text,
         "submitted_at": time.time(),
+        "ai_evaluation": None,  # Se completa si hay evaluación automática
     }
     st.session_state.writing_submissions.append(submission)  # Añade al historial
     st.session_state.last_writing_submission = submission  # Guarda referencia del último
@@ -550,42 +645,48 @@ def render_writing_submission_summary(mode_filter: Optional[str] = None) -> None
     if not submissions:  # Si no hay nada que mostrar
         return
 
+    import pandas as pd  # Import diferido: solo se necesita cuando hay envíos que mostrar
+
     st.subheader("Redacciones enviadas")  # Título de la tabla
-    rows = []  # Filas para el dataframe
-    for entry in submissions:  # Recorre cada envío
-        timestamp = entry.get("submitted_at")  # Marca de tiempo del envío
-        readable_time = time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp)) if timestamp else "—"  # Fecha legible
-        rows.append(  # Construye fila con valores amigables
-            {
-                "Ítem": entry.get("question_id"),
-                "Nivel": entry.get("level"),
-                "Tarea": (entry.get("task_type") or "writing").title(),
-                "Palabras": entry.get("word_count"),
-                "Modo": entry.get("mode"),
-                "IA nivel": (entry.get("ai_evaluation") or {}).get("level") or "—",
-                "IA puntaje": (entry.get("ai_evaluation") or {}).get("overall") or "—",
-                "Enviado": readable_time,
-            }
-        )
-    st.dataframe(rows, use_container_width=True)  # Muestra tabla responsive
+    # Una sola extracción por envío; las columnas se obtienen transponiendo las filas
+    question_ids, levels, task_types, word_counts, modes, timestamps, raw_evaluations = zip(
+        *map(_SUMMARY_FIELDS_GETTER, submissions)
+    )
+    evaluations = [evaluation or {} for evaluation in raw_evaluations]  # Evaluación IA por envío
+    table = pd.DataFrame(  # Construye la tabla por columnas en lugar de fila a fila
+        {
+            "Ítem": list(question_ids),
+            "Nivel": list(levels),
+            "Tarea": [(task_type or "writing").title() for task_type in task_types],
+            "Palabras": list(word_counts),
+            "Modo": list(modes),
+            "IA nivel": [evaluation.get("level") or "—" for evaluation in evaluations],
+            "IA puntaje": [evaluation.get("overall") or "—" for evaluation in evaluations],
+            "Enviado": [  # Fecha legible en hora local
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp)) if timestamp else "—"
+                for timestamp in timestamps
+            ],
+        }
+    )
+    st.dataframe(table, use_container_width=True)  # Muestra tabla responsive
 
 
 def build_writing_review_payload(submission: Dict[str, Any]) -> Dict[str, Any]:
     """Return a JSON-ready payload for manual grading or AI review services."""
 
-    return {  # Estructura limpia lista para enviarse como JSON
-        "item_id": submission.get("question_id"),
-        "level": submission.get("level"),
-        "task_type": submission.get("task_type"),
-        "rubric": submission.get("rubric", []),
-        "min_words": submission.get("min_words"),
-        "max_words": submission.get("max_words"),
-        "word_count": submission.get("word_count"),
-        "mode": submission.get("mode"),
-        "response": submission.get("response"),
-        "submitted_at": submission.get("submitted_at"),
-        "ai_evaluation": submission.get("ai_evaluation"),
-    }
+    # Estructura limpia lista para enviarse como JSON
+    return dict(zip(REVIEW_PAYLOAD_KEYS, _REVIEW_FIELDS_GETTER(submission)))
+
+
+@st.cache_resource(show_spinner=False)
+def get_review_session() -> requests.Session:
+    """Return a pooled HTTP session shared by writing review requests."""
+
+    session = requests.Session()  # Mantiene conexiones keep-alive entre peticiones
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)  # Pool acotado de conexiones
+    session.mount("https://", adapter)  # Aplica el pool a los endpoints seguros
+    session.mount("http://", adapter)  # Y también a los endpoints locales sin TLS
+    return session
 
 
 def submit_writing_review_request(
@@ -593,71 +694,109 @@ def submit_writing_review_request(
 ) -> Dict[str, Any]:
     """POST *payload* to ``endpoint_url`` expecting rubric scores and feedback."""
 
-    request_body = json.dumps(payload).encode("utf-8")  # Serializa payload como bytes
-    headers = {"Content-Type": "application/json"}  # Indica formato JSON
-    req = urlrequest.Request(endpoint_url, data=request_body, headers=headers, method="POST")  # Construye la petición
+    if orjson:  # Serializa directamente a bytes en una sola pasada
+        request_body = orjson.dumps(payload)
+    else:  # JSON compacto y sin escapes ASCII reduce el tamaño del cuerpo
+        request_body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = {  # Indica formato JSON y longitud exacta del cuerpo
+        "Content-Type": "application/json",
+        "Content-Length": str(len(request_body)),
+    }
+    session = get_review_session()  # Reutiliza conexiones abiertas entre envíos
     try:
-        with urlrequest.urlopen(req, timeout=timeout) as response:  # Envía petición y espera respuesta
-            raw = response.read().decode("utf-8")  # Lee contenido como texto
-            return json.loads(raw)  # Devuelve JSON parseado
-    except urlerror.URLError as exc:  # En caso de error de red
+        with st.spinner("Enviando redacción para revisión…"):  # Indica que la petición está en curso
+            response = session.post(endpoint_url, data=request_body, headers=headers, timeout=timeout)
+            response.raise_for_status()  # Trata respuestas HTTP de error como fallos
+            return response.json()  # Devuelve JSON parseado
+    except requests.RequestException as exc:  # En caso de error de red o respuesta inválida
         return {"status": "error", "message": str(exc)}  # Devuelve estructura simple de error
 
 
 def new_block(level: str) -> Dict[str, Any]:
     """Create a fresh block state for the requested level."""
 
+    rule = LEVEL_RULES[level]
     return {  # Estado inicial de un bloque adaptativo
         "level": level,
+        # Las reglas del nivel se copian al bloque para que los renders solo lean del estado
+        "block_size": rule["block_size"],
+        "promotion_threshold": rule["promotion_threshold"],
+        "goal": f"{rule['promotion_threshold']} / {rule['block_size']}",
         "presented": 0,
         "correct": 0,
         "wrong": 0,
         "used_ids": set(),
-        "used_group_ids": set(),
         "skill_sequence": skill_rotation_for_level(level),
     }
 
 
-def render_choice_radio(label: str, options: List[str], key: str) -> str | None:
+def display_choice_option(option: str) -> str:
+    """Return the on-screen text for a radio *option*, mapping the sentinel to its label."""
+
+    return CHOICE_PLACEHOLDER_DISPLAY if option == PLACEHOLDER_VALUE else option  # Texto visible de la opción
+
+
+def render_choice_radio(label: str, options: Sequence[str], key: str) -> str | None:
     """Render a radio group with an explicit placeholder for compatibility."""
 
     # Older Streamlit versions do not support ``index=None`` to avoid a default
-    # selection.  We prepend an explicit placeholder value that is guaranteed
-    # not to collide with the real options while keeping the on-screen label
-    # consistent.  ``format_func`` lets us map the internal sentinel back to the
-    # human-friendly copy.
-    placeholder_value = PLACEHOLDER_VALUE_BASE  # Valor centinela inicial
-    suffix = 1  # Contador por si hay colisiones
-    while placeholder_value in options:  # Genera un valor único
-        placeholder_value = f"{PLACEHOLDER_VALUE_BASE}_{suffix}"
-        suffix += 1
+    # selection.  We prepend an explicit placeholder value, framed with NUL
+    # characters so it cannot collide with the real options, while keeping the
+    # on-screen label consistent.  ``format_func`` maps the internal sentinel
+    # back to the human-friendly copy.
+    radio_options = [PLACEHOLDER_VALUE, *options]  # Inserta el centinela al inicio
 
-    placeholder_display = f"— {CHOICE_PLACEHOLDER_BASE} —"  # Texto visible de la opción vacía
-    radio_options = [placeholder_value] + list(options)  # Inserta el centinela al inicio
+    selection = st.radio(label, radio_options, key=key, format_func=display_choice_option)  # Renderiza el control
+    return None if selection == PLACEHOLDER_VALUE else selection  # Devuelve None si no se eligió opción
 
-    def display_option(option: str) -> str:  # Devuelve el texto a mostrar para cada opción
-        return placeholder_display if option == placeholder_value else option
 
-    selection = st.radio(label, radio_options, key=key, format_func=display_option)  # Renderiza el control
-    return None if selection == placeholder_value else selection  # Devuelve None si no se eligió opción
+def register_widget_key(prefix: str, key: str) -> None:
+    """Record *key* as a widget derived from *prefix* so it can be cleared later."""
+
+    families = st.session_state.setdefault("widget_families", {})  # Índice prefijo → llaves hijas
+    families.setdefault(prefix, set()).add(key)  # Registra la llave dentro de su familia
 
 
 def clear_widget_family(prefix: str) -> None:
     """Remove a widget key and any derived children from ``st.session_state``."""
 
-    for state_key in list(st.session_state.keys()):  # Copia de llaves para iterar sin modificar en caliente
-        if state_key == prefix or state_key.startswith(f"{prefix}_"):  # Coincide con el prefijo del widget
-            del st.session_state[state_key]  # Se elimina de la sesión
+    family = st.session_state.get("widget_families", {}).pop(prefix, None)  # Llaves registradas para el prefijo
+    if family is not None:  # Camino rápido: solo se tocan las llaves conocidas
+        st.session_state.pop(prefix, None)  # Elimina el widget base si existe
+        for state_key in family:  # Recorre únicamente la familia registrada
+            st.session_state.pop(state_key, None)  # Se elimina de la sesión
+        return
 
+    child_prefix = prefix + "_"  # Prefijo de las llaves derivadas, calculado una sola vez
+    matching = [  # Primera pasada: solo se guardan las llaves que coinciden
+        state_key
+        for state_key in st.session_state
+        if state_key == prefix or state_key.startswith(child_prefix)
+    ]
+    for state_key in matching:  # Segunda pasada: se borran sin modificar durante la iteración
+        del st.session_state[state_key]  # Se elimina de la sesión
 
-def rerun_app() -> None:
-    """Trigger a Streamlit rerun using the available API."""
 
+def rerun_app(*, scope: str = "app") -> None:
+    """Trigger a Streamlit rerun using the available API, limited to the running fragment when asked."""
+
+    if scope == "fragment" and hasattr(st, "fragment"):  # st.rerun acepta scope desde que existe st.fragment
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:  # El fragmento corre dentro de una ejecución completa: se recarga todo
+            pass
     rerun = getattr(st, "experimental_rerun", None) or getattr(st, "rerun", None)  # Obtiene la función disponible
     if rerun:  # Si la API existe en esta versión
         rerun()  # Fuerza la recarga de la app
 
 
+def cloze_markup(cloze_text: str) -> str:
+    """Return the HTML block that displays a gapped text with its line breaks."""
+
+    formatted = cloze_text.replace("\n", "<br />")  # Conserva saltos de línea al mostrar en HTML
+    return f"<div class='advanced-passage'>{formatted}</div>"
+
+
 def render_question_prompt(question: Dict[str, Any], *, show_passage: bool = True) -> None:
     """Display the main prompt and optional supporting text for a question."""
 
@@ -671,87 +810,146 @@ def render_question_prompt(question: Dict[str, Any], *, show_passage: bool = Tru
 
     cloze_text = question.get("cloze_text")  # Texto con huecos adicional
     if cloze_text:
-        formatted = cloze_text.replace("\n", "<br />")  # Conserva saltos de línea al mostrar en HTML
-        st.markdown(
-            f"<div class='advanced-passage'>{formatted}</div>",
-            unsafe_allow_html=True,
-        )
+        # El banco cacheado trae el HTML ya armado; solo se arma aquí si falta
+        st.markdown(question.get("cloze_html") or cloze_markup(cloze_text), unsafe_allow_html=True)
 
 
-def render_question_inputs(question: Dict[str, Any], key_prefix: str, *, advanced: bool = False) -> Any:
-    """Render the appropriate widget(s) for the question type and return the response."""
+def _gap_slots(count: int) -> List[Any]:
+    """Return one layout slot per gap: two columns for long sets, the page otherwise."""
 
-    qtype = question["type"]  # Identifica el tipo de ítem
-    if qtype == "multiple_choice":  # Opción múltiple clásica
-        label = (
-            "Seleccione la alternativa correcta"
-            if advanced
-            else "Elige la respuesta correcta"
-        )
-        return render_choice_radio(label, question["options"], key_prefix)  # Devuelve la opción elegida
-
-    if qtype == "cloze_mc":  # Huecos con opciones
-        responses: Dict[int, Optional[str]] = {}  # Respuestas por hueco
-        for item in question.get("cloze_items", []):  # Itera cada hueco numerado
-            gap_key = f"{key_prefix}_gap_{item['number']}"  # Clave única para el widget
-            responses[item["number"]] = render_choice_radio(
-                f"Hueco {item['number']}", item["options"], gap_key
-            )  # Guarda la selección
-        return responses  # Devuelve diccionario con elecciones
-
-    if qtype == "cloze_open":  # Huecos con respuesta abierta
-        responses = {}
-        for item in question.get("cloze_items", []):  # Cada hueco
-            gap_key = f"{key_prefix}_gap_{item['number']}"  # Clave única
+    if count < GAP_COLUMNS_MIN_ITEMS:  # Pocos huecos: se mantienen en una sola columna
+        return [nullcontext()] * count
+    slots: List[Any] = []
+    for _ in range(0, count, 2):  # Una fila nueva por cada par para que los huecos queden alineados
+        slots.extend(st.columns(2))
+    return slots[:count]  # Con un número impar, la última fila solo usa la columna izquierda
+
+
+def _render_multiple_choice_inputs(question: Dict[str, Any], key_prefix: str, advanced: bool) -> Any:
+    """Render the radio for a multiple choice item."""
+
+    label = (
+        "Seleccione la alternativa correcta"
+        if advanced
+        else "Elige la respuesta correcta"
+    )
+    register_widget_key(key_prefix, key_prefix)  # El radio usa directamente el prefijo
+    return render_choice_radio(label, question["options"], key_prefix)  # Devuelve la opción elegida
+
+
+def _render_cloze_mc_inputs(question: Dict[str, Any], key_prefix: str, advanced: bool) -> Any:
+    """Render one radio per gap of a cloze with options."""
+
+    responses: Dict[int, Optional[str]] = {}  # Respuestas por hueco
+    for item in question.get("cloze_items", []):  # Itera cada hueco numerado
+        gap_key = key_prefix + item["_widget_key"]  # Clave única para el widget
+        register_widget_key(key_prefix, gap_key)  # Se asocia a la familia de la pregunta
+        responses[item["number"]] = render_choice_radio(
+            f"Hueco {item['number']}", item["options"], gap_key
+        )  # Guarda la selección
+    return responses  # Devuelve diccionario con elecciones
+
+
+def _render_cloze_open_inputs(question: Dict[str, Any], key_prefix: str, advanced: bool) -> Any:
+    """Render one text input per gap of an open cloze."""
+
+    responses: Dict[int, str] = {}
+    items = question.get("cloze_items") or ()
+    for item, slot in zip(items, _gap_slots(len(items))):  # Cada hueco en su columna
+        gap_key = key_prefix + item["_widget_key"]  # Clave única
+        register_widget_key(key_prefix, gap_key)  # Se asocia a la familia de la pregunta
+        with slot:
             responses[item["number"]] = st.text_input(
                 f"Hueco {item['number']}", key=gap_key
             )  # Captura texto del usuario
-        return responses
+    return responses
+
+
+def _render_word_formation_inputs(question: Dict[str, Any], key_prefix: str, advanced: bool) -> Any:
+    """Render one text input per word formation sentence."""
 
-    if qtype == "word_formation":  # Formación de palabras
-        responses = {}
-        for item in question.get("word_formation_items", []):  # Itera cada oración base
-            gap_key = f"{key_prefix}_wf_{item['number']}"  # Clave por ítem
-            label = f"{item['number']}. {item['sentence']} ({item['base']})"  # Muestra la oración y la palabra base
+    responses: Dict[int, str] = {}
+    items = question.get("word_formation_items") or ()
+    for item, slot in zip(items, _gap_slots(len(items))):  # Itera cada oración base
+        gap_key = key_prefix + item["_widget_key"]  # Clave por ítem
+        register_widget_key(key_prefix, gap_key)  # Se asocia a la familia de la pregunta
+        label = f"{item['number']}. {item['sentence']} ({item['base']})"  # Muestra la oración y la palabra base
+        with slot:
             responses[item["number"]] = st.text_input(label, key=gap_key)  # Entrada de texto
-        return responses
+    return responses
 
-    if qtype == "key_transform":  # Transformaciones con palabra clave
-        responses = {}
-        for item in question.get("transform_items", []):  # Itera ejercicios
+
+def _render_key_transform_inputs(question: Dict[str, Any], key_prefix: str, advanced: bool) -> Any:
+    """Render the original sentence, keyword and rewrite box of each transformation."""
+
+    responses: Dict[int, str] = {}
+    items = question.get("transform_items") or ()
+    for item, slot in zip(items, _gap_slots(len(items))):  # Itera ejercicios
+        gap_key = key_prefix + item["_widget_key"]  # Clave única
+        register_widget_key(key_prefix, gap_key)  # Se asocia a la familia de la pregunta
+        with slot:
             st.write(f"{item['number']}. {item['original']}")  # Muestra la oración original
             st.caption(f"Palabra clave: {item['keyword']}")  # Indica la palabra obligatoria
-            gap_key = f"{key_prefix}_kt_{item['number']}"  # Clave única
             responses[item["number"]] = st.text_input(
                 "Reescribe la oración", key=gap_key
             )  # Captura la versión transformada
-        return responses
+    return responses
+
+
+def _render_writing_task_inputs(question: Dict[str, Any], key_prefix: str, advanced: bool) -> Any:
+    """Render the long writing task editor."""
+
+    return render_writing_inputs(question, key_prefix, advanced=advanced)
 
-    if qtype == WRITING_TYPE:  # Ejercicio de escritura larga
-        return render_writing_inputs(question, key_prefix, advanced=advanced)
 
-    return None  # Tipo no soportado
+_RENDERERS: Dict[str, Callable[[Dict[str, Any], str, bool], Any]] = {  # Widgets de cada tipo de ítem
+    "multiple_choice": _render_multiple_choice_inputs,
+    "cloze_mc": _render_cloze_mc_inputs,
+    "cloze_open": _render_cloze_open_inputs,
+    "word_formation": _render_word_formation_inputs,
+    "key_transform": _render_key_transform_inputs,
+    WRITING_TYPE: _render_writing_task_inputs,
+}
+
+
+def render_question_inputs(question: Dict[str, Any], key_prefix: str, *, advanced: bool = False) -> Any:
+    """Render the appropriate widget(s) for the question type and return the response."""
+
+    renderer = _RENDERERS.get(question["type"])  # Busca el renderizador del tipo de ítem
+    if renderer is None:
+        return None  # Tipo no soportado
+    return renderer(question, key_prefix, advanced)
 
 
-def prepare_question_instance(question: Dict[str, Any]) -> Dict[str, Any]:
-    """Return a detached copy of *question* with randomized options when needed."""
+def prepare_question_instance(question: Dict[str, Any], rng: Optional[random.Random] = None) -> Dict[str, Any]:
+    """Return a detached copy of *question* with options shuffled by *rng* (``random`` by default)."""
 
-    instance = deepcopy(question)
+    # Only the option lists and gap dicts change, so a shallow copy plus fresh
+    # copies of those keeps the cached bank untouched without a recursive copy.
+    instance = dict(question)
     qtype = instance.get("type")
+    shuffle = (rng or random).shuffle  # Fuera de una sesión se usa el generador global del módulo
 
     if qtype == "multiple_choice":
-        options = instance.get("options") or []
-        random.shuffle(options)
+        options = list(instance.get("options") or [])
+        shuffle(options)
         instance["options"] = options
         return instance
 
-    if qtype == "cloze_mc":
-        cloze_items = instance.get("cloze_items") or []
-        for item in cloze_items:
-            options = item.get("options") or []
-            random.shuffle(options)
-            item["options"] = options
-        instance["cloze_items"] = cloze_items
+    items_field = GAP_ITEM_FIELDS.get(qtype)
+    if items_field:
+        # Cada hueco guarda el sufijo de su widget para no formatearlo en cada rerun
+        suffix = GAP_WIDGET_SUFFIXES[qtype]
+        items = []
+        for item in instance.get(items_field) or []:
+            gap = dict(item)
+            gap["_widget_key"] = f"{suffix}{gap['number']}"
+            if qtype == "cloze_mc":
+                options = list(gap.get("options") or [])
+                shuffle(options)
+                gap["options"] = options
+            items.append(gap)
+        instance[items_field] = items
         return instance
 
     return instance
@@ -763,58 +961,58 @@ def normalize_free_text(value: Optional[str]) -> str:
     return (value or "").strip()
 
 
+@lru_cache(maxsize=4096)  # Las mismas respuestas se comparan en cada rerun
 def normalize_for_comparison(value: Optional[str]) -> str:
     """Lowercase ``value`` and collapse spaces to ease comparisons."""
 
     return " ".join(normalize_free_text(value).lower().split())
 
 
-def response_is_complete(question: Dict[str, Any], response: Any) -> bool:
-    """Return True when *response* satisfies the requirements of *question*."""
+def _collect_missing(items: Sequence[Dict[str, Any]], response: Any) -> List[str]:
+    """Return the numbers of the *items* left blank in a per-gap *response* dict."""
 
-    qtype = question["type"]
-    if qtype == "multiple_choice":
-        return response is not None
+    answers = response if isinstance(response, dict) else EMPTY_ANSWERS
+    return [
+        str(item["number"])
+        for item in items
+        if not (answers.get(item["number"]) or "").strip()
+    ]
 
-    if qtype in {"cloze_mc", "cloze_open"}:
-        if not isinstance(response, dict):
-            return False
-        for item in question.get("cloze_items", []):
-            if not normalize_free_text(response.get(item["number"])):
-                return False
-        return True
 
-    if qtype == "word_formation":
-        if not isinstance(response, dict):
-            return False
-        for item in question.get("word_formation_items", []):
-            if not normalize_free_text(response.get(item["number"])):
-                return False
-        return True
+def _check_completeness(question: Dict[str, Any], response: Any) -> Tuple[bool, List[str]]:
+    """Return whether *response* is complete plus the pending gap numbers, in one pass."""
 
-    if qtype == "key_transform":
-        if not isinstance(response, dict):
-            return False
-        for item in question.get("transform_items", []):
-            if not normalize_free_text(response.get(item["number"])):
-                return False
-        return True
+    qtype = question["type"]
+    if qtype == "multiple_choice":
+        return response is not None, []
+
+    items_field = GAP_ITEM_FIELDS.get(qtype)
+    if items_field:
+        missing = _collect_missing(question.get(items_field) or (), response)
+        return isinstance(response, dict) and not missing, missing
 
     if qtype == WRITING_TYPE:
         if not isinstance(response, str):
-            return False
+            return False, []
         word_count = count_words(response)
         min_words = question.get("min_words", 0)
         max_words = question.get("max_words", min_words)
-        return min_words <= word_count <= max_words
+        return min_words <= word_count <= max_words, []
+
+    return False, []
 
-    return False
+
+def response_is_complete(question: Dict[str, Any], response: Any) -> bool:
+    """Return True when *response* satisfies the requirements of *question*."""
+
+    return _check_completeness(question, response)[0]
 
 
 def validate_response(question: Dict[str, Any], response: Any) -> Optional[str]:
     """Return a warning message when *response* is incomplete."""
 
-    if response_is_complete(question, response):
+    complete, missing = _check_completeness(question, response)
+    if complete:
         return None
 
     qtype = question["type"]
@@ -822,29 +1020,14 @@ def validate_response(question: Dict[str, Any], response: Any) -> Optional[str]:
         return "Selecciona una alternativa antes de continuar."
 
     if qtype in {"cloze_mc", "cloze_open"}:
-        missing = [
-            str(item["number"])
-            for item in question.get("cloze_items", [])
-            if not normalize_free_text((response or {}).get(item["number"]))
-        ]
         if missing:
             return "Completa todos los huecos (pendientes: " + ", ".join(missing) + ")."
         return "Completa todos los huecos antes de enviar."
 
     if qtype == "word_formation":
-        missing = [
-            str(item["number"])
-            for item in question.get("word_formation_items", [])
-            if not normalize_free_text((response or {}).get(item["number"]))
-        ]
         return "Responde todas las transformaciones (pendientes: " + ", ".join(missing) + ")."
 
     if qtype == "key_transform":
-        missing = [
-            str(item["number"])
-            for item in question.get("transform_items", [])
-            if not normalize_free_text((response or {}).get(item["number"]))
-        ]
         return "Completa todas las reescrituras (pendientes: " + ", ".join(missing) + ")."
 
     if qtype == WRITING_TYPE:
@@ -865,130 +1048,160 @@ def validate_response(question: Dict[str, Any], response: Any) -> Optional[str]:
     return "Completa la respuesta antes de continuar."
 
 
-def score_question(question: Dict[str, Any], response: Any) -> Dict[str, Any]:
-    """Return a boolean score and a per-element breakdown for the question."""
+def _score_multiple_choice(question: Dict[str, Any], response: Any) -> Dict[str, Any]:
+    """Score a single-answer multiple choice item."""
 
-    breakdown: List[Dict[str, Any]] = []
-    qtype = question["type"]
+    expected = question["answer"]
+    is_correct = response == expected
+    breakdown = [
+        {
+            "label": "Respuesta",
+            "expected": expected,
+            "response": response or "—",
+            "correct": is_correct,
+        }
+    ]
+    return {"is_correct": is_correct, "breakdown": breakdown}
 
-    if qtype == "multiple_choice":
-        expected = question["answer"]
-        is_correct = response == expected
+
+def _score_gap_items(
+    items: Sequence[Dict[str, Any]],
+    response: Any,
+    label: str,
+    matches: Callable[[Optional[str], Dict[str, Any]], bool],
+) -> Dict[str, Any]:
+    """Score numbered gaps with *matches* and build one breakdown row per gap."""
+
+    answers = response if isinstance(response, dict) else EMPTY_ANSWERS
+    breakdown: List[Dict[str, Any]] = []
+    for item in items:
+        user_value = answers.get(item["number"])
         breakdown.append(
             {
-                "label": "Respuesta",
-                "expected": expected,
-                "response": response or "—",
-                "correct": is_correct,
+                "label": f"{label} {item['number']}",
+                "expected": item["answer"],
+                "response": user_value or "—",
+                "correct": matches(user_value, item),
             }
         )
-        return {"is_correct": is_correct, "breakdown": breakdown}
-
-    if qtype == "cloze_mc":
-        answers = response if isinstance(response, dict) else {}
-        for item in question.get("cloze_items", []):
-            user_value = answers.get(item["number"])
-            correct = user_value == item["answer"]
-            breakdown.append(
-                {
-                    "label": f"Hueco {item['number']}",
-                    "expected": item["answer"],
-                    "response": user_value or "—",
-                    "correct": correct,
-                }
-            )
-        return {"is_correct": all(entry["correct"] for entry in breakdown), "breakdown": breakdown}
-
-    if qtype == "cloze_open":
-        answers = response if isinstance(response, dict) else {}
-        for item in question.get("cloze_items", []):
-            user_value = answers.get(item["number"])
-            correct = normalize_for_comparison(user_value) == normalize_for_comparison(
-                item["answer"]
-            )
-            breakdown.append(
-                {
-                    "label": f"Hueco {item['number']}",
-                    "expected": item["answer"],
-                    "response": user_value or "—",
-                    "correct": correct,
-                }
-            )
-        return {"is_correct": all(entry["correct"] for entry in breakdown), "breakdown": breakdown}
+    return {"is_correct": all(entry["correct"] for entry in breakdown), "breakdown": breakdown}
 
-    if qtype == "word_formation":
-        answers = response if isinstance(response, dict) else {}
-        for item in question.get("word_formation_items", []):
-            user_value = answers.get(item["number"])
-            correct = normalize_for_comparison(user_value) == normalize_for_comparison(
-                item["answer"]
-            )
-            breakdown.append(
-                {
-                    "label": f"Ítem {item['number']}",
-                    "expected": item["answer"],
-                    "response": user_value or "—",
-                    "correct": correct,
-                }
-            )
-        return {"is_correct": all(entry["correct"] for entry in breakdown), "breakdown": breakdown}
 
-    if qtype == "key_transform":
-        answers = response if isinstance(response, dict) else {}
-        for item in question.get("transform_items", []):
-            user_value = answers.get(item["number"])
-            candidates = [item["answer"]] + item.get("alternatives", [])
-            correct = normalize_for_comparison(user_value) in {
-                normalize_for_comparison(candidate) for candidate in candidates
-            }
-            breakdown.append(
-                {
-                    "label": f"Transformación {item['number']}",
-                    "expected": item["answer"],
-                    "response": user_value or "—",
-                    "correct": correct,
-                }
-            )
-        return {"is_correct": all(entry["correct"] for entry in breakdown), "breakdown": breakdown}
+def _matches_exact(user_value: Optional[str], item: Dict[str, Any]) -> bool:
+    """Return True when the selected option is the expected one."""
 
-    if qtype == WRITING_TYPE:
-        text = response or ""
-        word_count = count_words(text)
-        min_words = question.get("min_words", 0)
-        max_words = question.get("max_words", min_words)
-        breakdown.append(
-            {
-                "label": "Conteo de palabras",
-                "expected": f"{min_words}–{max_words}",
-                "response": f"{word_count}",
-                "correct": min_words <= word_count <= max_words,
-            }
-        )
-        ai_result = evaluate_writing_with_ai(text, min_words=min_words, max_words=max_words)
-        if ai_result:
-            breakdown.extend(ai_result.get("breakdown_entries", []))
-            return {
-                "is_correct": True,
-                "breakdown": breakdown,
-                "word_count": word_count,
-                "ai_evaluation": ai_result,
-            }
-        breakdown.append(
-            {
-                "label": "Estado",
-                "expected": "Revisión docente/IA",
-                "response": "Pendiente",
-                "correct": True,
-            }
-        )
+    return user_value == item["answer"]
+
+
+def normalized_answer_set(item: Mapping[str, Any], *, with_alternatives: bool = False) -> FrozenSet[str]:
+    """Return the normalized accepted answers of a gap item."""
+
+    candidates = [item["answer"]]
+    if with_alternatives:
+        candidates.extend(item.get("alternatives", []))
+    return frozenset(normalize_for_comparison(candidate) for candidate in candidates)
+
+
+def _matches_normalized(user_value: Optional[str], item: Dict[str, Any]) -> bool:
+    """Return True when the typed answer matches ignoring case and spacing."""
+
+    accepted = item.get("_normalized_answers") or normalized_answer_set(item)
+    return normalize_for_comparison(user_value) in accepted
+
+
+def _matches_transform(user_value: Optional[str], item: Dict[str, Any]) -> bool:
+    """Return True when the rewrite matches the answer or an accepted alternative."""
+
+    accepted = item.get("_normalized_answers") or normalized_answer_set(item, with_alternatives=True)
+    return normalize_for_comparison(user_value) in accepted
+
+
+def _score_cloze_mc(question: Dict[str, Any], response: Any) -> Dict[str, Any]:
+    """Score a cloze with options per gap."""
+
+    return _score_gap_items(question.get("cloze_items") or (), response, "Hueco", _matches_exact)
+
+
+def _score_cloze_open(question: Dict[str, Any], response: Any) -> Dict[str, Any]:
+    """Score an open cloze."""
+
+    return _score_gap_items(question.get("cloze_items") or (), response, "Hueco", _matches_normalized)
+
+
+def _score_word_formation(question: Dict[str, Any], response: Any) -> Dict[str, Any]:
+    """Score a word formation set."""
+
+    return _score_gap_items(
+        question.get("word_formation_items") or (), response, "Ítem", _matches_normalized
+    )
+
+
+def _score_key_transform(question: Dict[str, Any], response: Any) -> Dict[str, Any]:
+    """Score key word transformations, accepting listed alternatives."""
+
+    return _score_gap_items(
+        question.get("transform_items") or (), response, "Transformación", _matches_transform
+    )
+
+
+def _score_writing(question: Dict[str, Any], response: Any) -> Dict[str, Any]:
+    """Check the word range and attach the automatic rubric when available."""
+
+    breakdown: List[Dict[str, Any]] = []
+    text = response or ""
+    word_count = count_words(text)
+    min_words = question.get("min_words", 0)
+    max_words = question.get("max_words", min_words)
+    breakdown.append(
+        {
+            "label": "Conteo de palabras",
+            "expected": f"{min_words}–{max_words}",
+            "response": f"{word_count}",
+            "correct": min_words <= word_count <= max_words,
+        }
+    )
+    ai_result = evaluate_writing_with_ai(text, min_words=min_words, max_words=max_words)
+    if ai_result:
+        breakdown.extend(ai_result.get("breakdown_entries", []))
         return {
             "is_correct": True,
             "breakdown": breakdown,
-            "pending_manual_review": True,
             "word_count": word_count,
+            "ai_evaluation": ai_result,
         }
+    breakdown.append(
+        {
+            "label": "Estado",
+            "expected": "Revisión docente/IA",
+            "response": "Pendiente",
+            "correct": True,
+        }
+    )
+    return {
+        "is_correct": True,
+        "breakdown": breakdown,
+        "pending_manual_review": True,
+        "word_count": word_count,
+    }
+
+
+_SCORERS: Dict[str, Callable[[Dict[str, Any], Any], Dict[str, Any]]] = {  # Corrector de cada tipo de ítem
+    "multiple_choice": _score_multiple_choice,
+    "cloze_mc": _score_cloze_mc,
+    "cloze_open": _score_cloze_open,
+    "word_formation": _score_word_formation,
+    "key_transform": _score_key_transform,
+    WRITING_TYPE: _score_writing,
+}
 
-    return {"is_correct": False, "breakdown": breakdown}
+
+def score_question(question: Dict[str, Any], response: Any) -> Dict[str, Any]:
+    """Return a boolean score and a per-element breakdown for the question."""
+
+    scorer = _SCORERS.get(question["type"])
+    if scorer is None:  # Tipo sin corrector conocido
+        return {"is_correct": False, "breakdown": []}
+    return scorer(question, response)
 
 
 def format_correct_answer(question: Dict[str, Any]) -> Optional[str]:
@@ -1029,9 +1242,10 @@ def build_feedback_payload(question: Dict[str, Any], score_result: Dict[str, Any
         "correct": score_result.get("is_correct", False),
         "question": question["text"],
         "skill": question["skill"],
+        "skill_label": question.get("skill_label"),
         "id": question["id"],
         "explanation": question.get("explanation"),
-        "answer": format_correct_answer(question),
+        "answer": question.get("answer_summary") or format_correct_answer(question),
         "breakdown": score_result.get("breakdown", []),
     }
     if score_result.get("ai_evaluation"):
@@ -1043,6 +1257,18 @@ def build_feedback_payload(question: Dict[str, Any], score_result: Dict[str, Any
     return payload
 
 
+def _cached_feedback_table(
+    feedback: Dict[str, Any], cache_key: str, build: Callable[[], Dict[str, List[Any]]]
+) -> Dict[str, List[Any]]:
+    """Return the column-oriented table stored on *feedback*, building it on first use."""
+
+    # El feedback vive en la sesión, así que la tabla sobrevive a los reruns
+    table = feedback.get(cache_key)
+    if table is None:
+        table = feedback[cache_key] = build()
+    return table
+
+
 def render_feedback_panel(feedback: Dict[str, Any], expander_label: str) -> None:
     """Render the expandable explanation block shared by both modes."""
 
@@ -1059,14 +1285,15 @@ def render_feedback_panel(feedback: Dict[str, Any], expander_label: str) -> None
             scores = ai_evaluation.get("scores", {})
             if scores:
                 st.table(
-                    [
-                        {
-                            "Criterio": label.title(),
-                            "Puntaje": value,
-                            "Referente": "0–5",
-                        }
-                        for label, value in scores.items()
-                    ]
+                    _cached_feedback_table(
+                        feedback,
+                        "_score_table",
+                        lambda: {  # Una lista por columna en lugar de un dict por fila
+                            "Criterio": [label.title() for label in scores],
+                            "Puntaje": list(scores.values()),
+                            "Referente": ["0–5"] * len(scores),
+                        },
+                    )
                 )
             st.caption(
                 "Modelo heurístico local usando textstat: analiza vocabulario, cohesión y legibilidad para aproximar CEFR."
@@ -1089,15 +1316,16 @@ def render_feedback_panel(feedback: Dict[str, Any], expander_label: str) -> None
         if breakdown:
             st.write("Detalle de respuestas:")
             st.table(
-                [
-                    {
-                        "Elemento": entry.get("label"),
-                        "Tu respuesta": entry.get("response") or "—",
-                        "Correcta": entry.get("expected"),
-                        "Estado": "✅" if entry.get("correct") else "❌",
-                    }
-                    for entry in breakdown
-                ]
+                _cached_feedback_table(
+                    feedback,
+                    "_breakdown_table",
+                    lambda: {  # Una lista por columna en lugar de un dict por fila
+                        "Elemento": [entry.get("label") for entry in breakdown],
+                        "Tu respuesta": [entry.get("response") or "—" for entry in breakdown],
+                        "Correcta": [entry.get("expected") for entry in breakdown],
+                        "Estado": ["✅" if entry.get("correct") else "❌" for entry in breakdown],
+                    },
+                )
             )
 
         answer = feedback.get("answer")
@@ -1111,7 +1339,7 @@ def render_feedback_alert(feedback: Dict[str, Any]) -> None:
     if not feedback:
         return
 
-    skill_name = feedback["skill"].replace("_", " ").title()
+    skill_name = feedback.get("skill_label") or feedback["skill"].replace("_", " ").title()
     if feedback.get("ai_evaluation"):
         ai_level = feedback["ai_evaluation"].get("level")
         detail = (
@@ -1152,36 +1380,52 @@ def advanced_exam_layout():
         st.markdown("</div>", unsafe_allow_html=True)
 
 
+def _first_present(questions: Sequence[Dict[str, Any]], key: str) -> Any:
+    """Return the first truthy *key* value among *questions*, or ``None``."""
+
+    return next((question[key] for question in questions if question.get(key)), None)
+
+
 def build_groups_for_level(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Return the list of grouped passages available for the provided *items*."""
 
-    grouped: Dict[str, Dict[str, Any]] = {}
+    # Primera pasada: solo se reparten las preguntas por grupo
+    questions_by_group: DefaultDict[str, List[Dict[str, Any]]] = defaultdict(list)
     for question in items:
         group_id = question.get("group_id")
-        if not group_id:
-            continue
+        if group_id:
+            questions_by_group[group_id].append(question)
 
-        group = grouped.setdefault(
-            group_id,
-            {
-                "group_id": group_id,
-                "passage": question.get("passage"),
-                "part": question.get("part"),
-                "estimated_time": question.get("estimated_time"),
-                "questions": [],
-            },
-        )
+    # Segunda pasada: los metadatos se resuelven una vez por grupo distinto
+    return [
+        {
+            "group_id": group_id,
+            "passage": _first_present(questions, "passage"),
+            "part": _first_present(questions, "part"),
+            "estimated_time": _first_present(questions, "estimated_time"),
+            "questions": questions,
+        }
+        for group_id, questions in questions_by_group.items()
+    ]
 
-        if not group.get("passage") and question.get("passage"):
-            group["passage"] = question["passage"]
-        if not group.get("part") and question.get("part"):
-            group["part"] = question["part"]
-        if not group.get("estimated_time") and question.get("estimated_time"):
-            group["estimated_time"] = question["estimated_time"]
 
-        group["questions"].append(question)
+@dataclass(slots=True)
+class GroupState:
+    """Progress through the advanced grouped passage currently on screen."""
 
-    return [group for group in grouped.values() if group["questions"]]
+    level: str
+    group_id: str
+    passage: Optional[str]
+    part: Optional[str]
+    questions: List[Dict[str, Any]]
+    estimated_time: Optional[int] = None
+    current_index: int = 0
+    responses: Dict[str, Any] = field(default_factory=dict)
+    passage_html: str = ""  # HTML del pasaje, armado al iniciar el grupo
+    completeness: Optional[List[bool]] = None  # Estado de respuesta de cada pregunta
+    summary_mask: Optional[Tuple[bool, ...]] = None  # Estado con el que se armó summary_html
+    summary_html: str = ""  # Franja de estado ya renderizada
+    widget_keys: Tuple[str, ...] = ()  # Prefijo de widget de cada pregunta, formateado al iniciar
 
 
 def clear_current_group_state() -> None:
@@ -1191,8 +1435,7 @@ def clear_current_group_state() -> None:
     if not group_state:
         return
 
-    for question in group_state.get("questions", []):
-        key = f"group_{group_state['group_id']}_{question['id']}"
+    for key in group_state.widget_keys:  # Llaves ya formateadas; un grupo vacío no itera
         clear_widget_family(key)
 
     st.session_state.current_group_state = None
@@ -1202,32 +1445,38 @@ def clear_current_group_state() -> None:
 
 
 def start_group_for_block(
-    level: str, questions_by_level: Dict[str, List[Dict[str, Any]]], block: Dict[str, Any]
-) -> Dict[str, Any] | None:
+    level: str, groups_by_level: Mapping[str, List[Dict[str, Any]]], block: Dict[str, Any]
+) -> Optional[GroupState]:
     """Pick and initialise the next advanced group for the *level*, when any."""
 
-    groups = build_groups_for_level(questions_by_level[level])
+    groups = groups_by_level.get(level)
     if not groups:
         return None
 
-    available = [g for g in groups if g["group_id"] not in block["used_group_ids"]]
-    chosen = random.choice(available or groups)
-    block["used_group_ids"].add(chosen["group_id"])
-    randomized_questions = [prepare_question_instance(question) for question in chosen["questions"]]
+    rng = session_rng()
+    available = block.get("available_groups")
+    if not available:  # Al inicio del bloque o al agotarse los grupos se baraja la lista completa
+        available = list(range(len(groups)))
+        rng.shuffle(available)  # Orden aleatorio fijado una vez; se consume desde la cola
+        block["available_groups"] = available
+    chosen = groups[available.pop()]
+    randomized_questions = [prepare_question_instance(question, rng) for question in chosen["questions"]]
 
     for question in chosen["questions"]:
         block["used_ids"].add(question["id"])
 
-    group_state = {
-        "level": level,
-        "group_id": chosen["group_id"],
-        "passage": chosen.get("passage"),
-        "part": chosen.get("part"),
-        "questions": randomized_questions,
-        "current_index": 0,
-        "responses": {},
-        "estimated_time": chosen.get("estimated_time"),
-    }
+    group_state = GroupState(
+        level=level,
+        group_id=chosen["group_id"],
+        passage=chosen.get("passage"),
+        part=chosen.get("part"),
+        questions=randomized_questions,
+        estimated_time=chosen.get("estimated_time"),
+        passage_html=(  # El pasaje no cambia durante el grupo: el HTML se arma una vez
+            f"<div class='advanced-passage'>{chosen['passage']}</div>" if chosen.get("passage") else ""
+        ),
+        widget_keys=tuple(f"group_{chosen['group_id']}_{question['id']}" for question in randomized_questions),
+    )
 
     timer_duration = chosen.get("estimated_time")
     if timer_duration:
@@ -1245,6 +1494,7 @@ def start_group_for_block(
     return group_state
 
 
+@lru_cache(maxsize=7200)  # Dos horas a resolución de un segundo
 def format_remaining_time(seconds: int) -> str:
     minutes, secs = divmod(seconds, 60)
     if minutes and secs:
@@ -1254,24 +1504,37 @@ def format_remaining_time(seconds: int) -> str:
     return f"{secs:02d} s"
 
 
-def render_group_timer(group_state: Dict[str, Any]) -> None:
+def render_group_timer(group_state: Optional[GroupState]) -> None:
     """Display the countdown indicator for an advanced group if configured."""
 
-    duration = st.session_state.get("group_timer_duration")
+    session = st.session_state  # Referencia local para las lecturas repetidas
+    duration = session.get("group_timer_duration")
     if not duration or not group_state:
         return
 
-    if st.session_state.get("group_timer_group_id") != group_state["group_id"]:
-        st.session_state.group_timer_started_at = time.time()
-        st.session_state.group_timer_group_id = group_state["group_id"]
+    now = time.time()  # Un único instante para todo el cálculo
+    if session.get("group_timer_group_id") != group_state.group_id:
+        session.group_timer_started_at = now
+        session.group_timer_group_id = group_state.group_id
 
-    started_at = st.session_state.get("group_timer_started_at") or time.time()
-    elapsed = time.time() - started_at
+    started_at = session.get("group_timer_started_at") or now
+    elapsed = now - started_at
     remaining = max(int(duration - elapsed), 0)
     st.progress(remaining / duration)
     st.caption(f"Tiempo sugerido restante: {format_remaining_time(remaining)}")
 
 
+def _with_normalized_answers(
+    items: List[Dict[str, Any]], *, with_alternatives: bool = False
+) -> List[Dict[str, Any]]:
+    """Return copies of open *items* carrying their normalized accepted answers."""
+
+    return [
+        {**item, "_normalized_answers": normalized_answer_set(item, with_alternatives=with_alternatives)}
+        for item in items
+    ]
+
+
 def normalize_item_for_ui(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """Return a UI-ready copy of *item* when supported, otherwise ``None``."""
 
@@ -1279,25 +1542,22 @@ def normalize_item_for_ui(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     if item_type not in SUPPORTED_UI_TYPES:
         return None
 
+    item_id, prompt, skill, level = _ITEM_CORE_GETTER(item)  # Campos obligatorios en una sola llamada
     question: Dict[str, Any] = {
-        "id": item["id"],
-        "text": item["prompt"],
-        "skill": item["skill"],
-        "level": item["level"],
+        "id": item_id,
+        "text": prompt,
+        "skill": skill,
+        "level": level,
         "type": item_type,
-        "explanation": item.get("explanation"),
-        "group_id": item.get("group_id"),
-        "part": item.get("part"),
-        "passage": item.get("passage"),
-        "estimated_time": item.get("estimated_time"),
     }
+    question.update(zip(ITEM_OPTIONAL_FIELDS, map(item.get, ITEM_OPTIONAL_FIELDS)))  # Opcionales, None si faltan
 
     if item_type == "multiple_choice":
         options = item.get("options")
         answer = item.get("answer")
         if not options or answer not in options:
             return None
-        question["options"] = options
+        question["options"] = tuple(options)  # Inmutable: el banco se comparte por referencia entre sesiones
         question["answer"] = answer
         return question
 
@@ -1314,21 +1574,21 @@ def normalize_item_for_ui(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         if not cloze_items:
             return None
         question["cloze_text"] = item.get("cloze_text") or item.get("passage") or ""
-        question["cloze_items"] = cloze_items
+        question["cloze_items"] = _with_normalized_answers(cloze_items)
         return question
 
     if item_type == "word_formation":
         wf_items = item.get("word_formation_items")
         if not wf_items:
             return None
-        question["word_formation_items"] = wf_items
+        question["word_formation_items"] = _with_normalized_answers(wf_items)
         return question
 
     if item_type == "key_transform":
         tf_items = item.get("transform_items")
         if not tf_items:
             return None
-        question["transform_items"] = tf_items
+        question["transform_items"] = _with_normalized_answers(tf_items, with_alternatives=True)
         return question
 
     if item_type == WRITING_TYPE:
@@ -1341,11 +1601,10 @@ def normalize_item_for_ui(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     return None
 
 
-@st.cache_data(show_spinner=False)
-def get_questions_by_level() -> Dict[str, List[Dict[str, Any]]]:
-    """Load and normalize the item bank grouped by CEFR level."""
+def _build_questions_by_level(bank_path: Path) -> Dict[str, List[Dict[str, Any]]]:
+    """Parse the JSON bank at *bank_path* and normalize its items by CEFR level."""
 
-    bank = load_item_bank(ITEM_BANK_PATH)
+    bank = load_item_bank(bank_path)
     questions: Dict[str, List[Dict[str, Any]]] = {}
 
     for level in LEVEL_SEQUENCE:
@@ -1354,6 +1613,11 @@ def get_questions_by_level() -> Dict[str, List[Dict[str, Any]]]:
         for item in items:
             normalized = normalize_item_for_ui(item)
             if normalized:
+                # El resumen de la respuesta es fijo: se calcula una vez junto con el banco cacheado
+                normalized["answer_summary"] = format_correct_answer(normalized)
+                normalized["skill_label"] = normalized["skill"].replace("_", " ").title()
+                if normalized.get("cloze_text"):
+                    normalized["cloze_html"] = cloze_markup(normalized["cloze_text"])
                 usable_items.append(normalized)
 
         questions[level] = usable_items
@@ -1361,70 +1625,153 @@ def get_questions_by_level() -> Dict[str, List[Dict[str, Any]]]:
     return questions
 
 
+def _questions_snapshot_cutoff(bank_path: Path) -> float:
+    """Return the newest mtime among the JSON bank and the modules that normalize it."""
+
+    sources = (bank_path, Path(__file__), Path(english_test_bank.__file__))  # Banco, esta app y el cargador
+    return max(source.stat().st_mtime for source in sources)
+
+
+def _load_questions_snapshot(snapshot_path: Path, newer_than: float) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """Return the pickled bank at *snapshot_path* if it is newer than *newer_than*, otherwise ``None``."""
+
+    try:
+        if snapshot_path.stat().st_mtime < newer_than:  # El JSON o el código de normalización cambiaron después
+            return None
+        with snapshot_path.open("rb") as handle:
+            return pickle.load(handle)
+    except Exception:  # Copia ausente, truncada o de otra versión: se vuelve al JSON
+        return None
+
+
+def _save_questions_snapshot(snapshot_path: Path, questions: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Write *questions* next to the JSON bank, ignoring read-only or full disks."""
+
+    temp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    try:
+        with temp_path.open("wb") as handle:
+            pickle.dump(questions, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_path.replace(snapshot_path)  # Reemplazo atómico: nunca se lee una copia a medias
+    except OSError:  # Sin permisos de escritura la app sigue funcionando desde el JSON
+        temp_path.unlink(missing_ok=True)
+
+
+@st.cache_resource(show_spinner=False)  # Por referencia: el banco solo se lee y las instancias se copian
+def get_questions_by_level() -> Dict[str, List[Dict[str, Any]]]:
+    """Load and normalize the item bank grouped by CEFR level."""
+
+    # La copia pickle evita reparsear el JSON en cada proceso nuevo; se invalida si cambian el banco o el código
+    snapshot_path = ITEM_BANK_PATH.with_suffix(".pkl")
+    questions = _load_questions_snapshot(snapshot_path, _questions_snapshot_cutoff(ITEM_BANK_PATH))
+    if questions is None:
+        questions = _build_questions_by_level(ITEM_BANK_PATH)
+        _save_questions_snapshot(snapshot_path, questions)
+    return questions
+
+
+@st.cache_resource(show_spinner=False)
+def get_groups_by_level() -> Dict[str, List[Dict[str, Any]]]:
+    """Group the cached item bank into advanced passages once per bank load."""
+
+    # Se comparte por referencia: start_group_for_block solo lee los grupos y copia sus preguntas
+    questions_by_level = get_questions_by_level()
+    return {level: build_groups_for_level(items) for level, items in questions_by_level.items()}
+
+
+ADAPTIVE_STATE_DEFAULTS: Mapping[str, Any] = MappingProxyType({  # Valores inmutables iniciales del modo adaptativo
+    "mode": "adaptive",
+    "level_idx": 0,
+    "finished": False,
+    "final_level": None,
+    "confirmed": False,
+    "current_question": None,
+    "current_question_key": None,
+    "last_adaptive_feedback": None,
+    "pending_level_message": None,
+    "onboarding_complete": False,
+    "consent_checked": False,
+    "current_group_state": None,
+    "group_timer_started_at": None,
+    "group_timer_group_id": None,
+    "group_timer_duration": None,
+    "finished_tables": None,
+})
+ADAPTIVE_STATE_FACTORIES: Mapping[str, Callable[[], Any]] = MappingProxyType({  # Estado mutable: se crea solo si falta
+    "block": lambda: new_block(LEVEL_SEQUENCE[0]),
+    "passed_blocks": lambda: {lvl: 0 for lvl in LEVEL_SEQUENCE},
+    "history": list,
+    "block_results": list,
+    "rng": random.Random,  # Generador propio de la sesión, sembrado con entropía del sistema
+})
+
+
 def ensure_adaptive_state() -> None:
     """Guarantee that the adaptive engine state exists in session."""
 
-    if "mode" not in st.session_state:
-        st.session_state.mode = "adaptive"
-    if "level_idx" not in st.session_state:
-        st.session_state.level_idx = 0
-    if "block" not in st.session_state:
-        st.session_state.block = new_block(LEVEL_SEQUENCE[0])
-    if "used_group_ids" not in st.session_state.block:
-        st.session_state.block["used_group_ids"] = set()
-    if "passed_blocks" not in st.session_state:
-        st.session_state.passed_blocks = {lvl: 0 for lvl in LEVEL_SEQUENCE}
-    if "history" not in st.session_state:
-        st.session_state.history = []
-    if "block_results" not in st.session_state:
-        st.session_state.block_results = []
-    if "finished" not in st.session_state:
-        st.session_state.finished = False
-    if "final_level" not in st.session_state:
-        st.session_state.final_level = None
-    if "confirmed" not in st.session_state:
-        st.session_state.confirmed = False
-    if "current_question" not in st.session_state:
-        st.session_state.current_question = None
-    if "current_question_key" not in st.session_state:
-        st.session_state.current_question_key = None
-    if "last_adaptive_feedback" not in st.session_state:
-        st.session_state.last_adaptive_feedback = None
-    if "pending_level_message" not in st.session_state:
-        st.session_state.pending_level_message = None
-    if "onboarding_complete" not in st.session_state:
-        st.session_state.onboarding_complete = False
-    if "consent_checked" not in st.session_state:
-        st.session_state.consent_checked = False
-    if "current_group_state" not in st.session_state:
-        st.session_state.current_group_state = None
-    if "group_timer_started_at" not in st.session_state:
-        st.session_state.group_timer_started_at = None
-    if "group_timer_group_id" not in st.session_state:
-        st.session_state.group_timer_group_id = None
-    if "group_timer_duration" not in st.session_state:
-        st.session_state.group_timer_duration = None
+    session = st.session_state
+    for key, value in ADAPTIVE_STATE_DEFAULTS.items():
+        session.setdefault(key, value)
+    for key, factory in ADAPTIVE_STATE_FACTORIES.items():
+        if key not in session:
+            session[key] = factory()
+
+
+def session_rng() -> random.Random:
+    """Return the random generator owned by this session, creating it on first use."""
+
+    rng = st.session_state.get("rng")
+    if rng is None:
+        rng = st.session_state.rng = random.Random()
+    return rng
 
 
 def reset_adaptive_state() -> None:
     """Start the adaptive engine from the beginning."""
 
+    session = st.session_state  # Referencia local para las lecturas repetidas
     clear_current_group_state()
-    st.session_state.level_idx = 0
-    st.session_state.block = new_block(LEVEL_SEQUENCE[0])
-    st.session_state.passed_blocks = {lvl: 0 for lvl in LEVEL_SEQUENCE}
-    st.session_state.history = []
-    st.session_state.block_results = []
-    st.session_state.finished = False
-    st.session_state.final_level = None
-    st.session_state.confirmed = False
-    st.session_state.current_question = None
-    st.session_state.current_question_key = None
-    st.session_state.last_adaptive_feedback = None
-    st.session_state.pending_level_message = None
-    st.session_state.group_timer_started_at = None
-    st.session_state.group_timer_group_id = None
-    st.session_state.group_timer_duration = None
+    session.level_idx = 0
+    session.block = new_block(LEVEL_SEQUENCE[0])
+    session.passed_blocks = {lvl: 0 for lvl in LEVEL_SEQUENCE}
+    session.history = []
+    session.block_results = []
+    session.finished = False
+    session.final_level = None
+    session.confirmed = False
+    session.current_question = None
+    session.current_question_key = None
+    session.last_adaptive_feedback = None
+    session.pending_level_message = None
+    session.group_timer_started_at = None
+    session.group_timer_group_id = None
+    session.group_timer_duration = None
+    session.finished_tables = None
+
+
+def _index_unused_by_skill(
+    questions: List[Dict[str, Any]], used_ids: Set[str], rng: random.Random
+) -> Dict[str, List[int]]:
+    """Return the shuffled positions of the questions not yet used, grouped by skill."""
+
+    by_skill: Dict[str, List[int]] = {}
+    for index, question in enumerate(questions):
+        if question["id"] not in used_ids:
+            by_skill.setdefault(question["skill"], []).append(index)
+    for positions in by_skill.values():  # Se baraja una vez; cada elección toma la cola
+        rng.shuffle(positions)
+    return by_skill
+
+
+def _draw_unused(
+    pool: Optional[List[int]], questions: List[Dict[str, Any]], used_ids: Set[str]
+) -> Optional[Dict[str, Any]]:
+    """Pop positions off the shuffled *pool* until one points to an unused question."""
+
+    while pool:
+        question = questions[pool.pop()]
+        if question["id"] not in used_ids:  # Pudo usarse dentro de un grupo tras indexar
+            return question
+    return None
 
 
 def pick_question_for_block(
@@ -1438,152 +1785,210 @@ def pick_question_for_block(
     if not block.get("skill_sequence"):
         block["skill_sequence"] = sequence
     desired_skill = sequence[block["presented"] % len(sequence)]
-    pool = [
-        q for q in questions_by_level[level] if q["id"] not in block["used_ids"]
-    ]
-    preferred = [q for q in pool if q["skill"] == desired_skill]
-
-    if preferred:
-        chosen = random.choice(preferred)
-    elif pool:
-        chosen = random.choice(pool)
-    else:
+    questions = questions_by_level[level]
+    used_ids = block["used_ids"]
+    rng = session_rng()
+    available = block.get("available_by_skill")
+    if available is None:  # Se indexa el banco del nivel una sola vez por bloque
+        available = block["available_by_skill"] = _index_unused_by_skill(questions, used_ids, rng)
+
+    chosen = _draw_unused(available.get(desired_skill), questions, used_ids)
+    while chosen is None:
+        pools = [pool for pool in available.values() if pool]
+        if not pools:
+            break
+        pool = rng.choices(pools, weights=[len(pool) for pool in pools])[0]  # Uniforme entre los restantes
+        chosen = _draw_unused(pool, questions, used_ids)
+
+    if chosen is None:
         # Exhausted the set within the block – allow reuse to avoid dead ends.
-        chosen = random.choice(questions_by_level[level])
-        block["used_ids"].clear()
+        chosen = rng.choice(questions)
+        used_ids.clear()
+        block.pop("available_by_skill", None)  # Se reconstruye en la próxima elección
 
-    block["used_ids"].add(chosen["id"])
-    return prepare_question_instance(chosen)
+    used_ids.add(chosen["id"])
+    return prepare_question_instance(chosen, rng)
 
 
 def finish_adaptive(level: str, confirmed: bool) -> None:
     """Mark the adaptive flow as finished with the supplied outcome."""
 
+    session = st.session_state  # Referencia local para las lecturas repetidas
     clear_current_group_state()
-    st.session_state.finished = True
-    st.session_state.final_level = level
-    st.session_state.confirmed = confirmed
-    st.session_state.level_idx = LEVEL_SEQUENCE.index(level)
-    st.session_state.current_question = None
-    st.session_state.current_question_key = None
-    st.session_state.pending_level_message = None
+    session.finished = True
+    session.final_level = level
+    session.confirmed = confirmed
+    session.level_idx = LEVEL_INDEX[level]
+    session.current_question = None
+    session.current_question_key = None
+    session.pending_level_message = None
 
 
 def best_level_guess() -> str:
     """Infer the best level based on the blocks already passed."""
 
-    highest_idx = None
-    for idx, level in enumerate(LEVEL_SEQUENCE):
-        if st.session_state.passed_blocks.get(level, 0) > 0:
-            highest_idx = idx
+    session = st.session_state  # Referencia local para las lecturas repetidas
+    passed_blocks = session.passed_blocks
+    # Se recorre desde el nivel más alto y se corta en el primero superado
+    return next(
+        (level for level in reversed(LEVEL_SEQUENCE) if passed_blocks.get(level, 0) > 0),
+        LEVEL_SEQUENCE[session.level_idx],
+    )
+
 
-    if highest_idx is not None:
-        return LEVEL_SEQUENCE[highest_idx]
+class BlockResult(NamedTuple):
+    """Outcome of one completed adaptive block."""
 
-    return LEVEL_SEQUENCE[st.session_state.level_idx]
+    level: str
+    correct: int
+    wrong: int
+    presented: int
+    goal: str
+    passed: bool
 
 
 def record_block_result(block: Dict[str, Any], passed: bool) -> None:
     """Persist the result of the completed block for later reporting."""
 
-    level = block["level"]
-    rule = LEVEL_RULES[level]
     st.session_state.block_results.append(
-        {
-            "level": level,
-            "correct": block["correct"],
-            "wrong": block["wrong"],
-            "presented": block["presented"],
-            "goal": f"{rule['promotion_threshold']} / {rule['block_size']}",
-            "passed": passed,
-        }
+        BlockResult(block["level"], block["correct"], block["wrong"], block["presented"], block["goal"], passed)
     )
 
 
+@lru_cache(maxsize=16)  # Pocas combinaciones umbral/tamaño y todas estáticas
+def sprt_decision_table(threshold: int, block_size: int) -> Mapping[Tuple[int, int], str]:
+    """Map each (correct, wrong) count of a block to ``promote``, ``demote`` or ``continue``."""
+
+    # Razón de verosimilitud de Bernoulli entre dominar el nivel (p alta) y no dominarlo (p baja)
+    pass_rate = threshold / block_size
+    p_high = min(pass_rate + SPRT_INDIFFERENCE, 0.99)
+    p_low = max(pass_rate - SPRT_INDIFFERENCE, 0.01)
+    correct_step = math.log(p_high / p_low)
+    wrong_step = math.log((1 - p_high) / (1 - p_low))
+    bound = math.log((1 - SPRT_ERROR_RATE) / SPRT_ERROR_RATE)  # Con α = β los límites son simétricos
+    max_wrong = block_size - threshold  # Errores que aún permiten alcanzar el umbral
+
+    table: Dict[Tuple[int, int], str] = {}
+    for correct in range(block_size + 1):
+        for wrong in range(block_size + 1 - correct):
+            ratio = correct * correct_step + wrong * wrong_step
+            if ratio >= bound and correct >= threshold:  # Nunca se promueve por debajo del umbral del bloque
+                table[correct, wrong] = "promote"
+            elif ratio <= -bound and wrong > max_wrong:  # Nunca se baja mientras el umbral siga alcanzable
+                table[correct, wrong] = "demote"
+            else:
+                table[correct, wrong] = "continue"
+    return MappingProxyType(table)
+
+
 def evaluate_block_completion(block: Dict[str, Any]) -> None:
     """Check if the current block finished and act according to the rules."""
 
+    session = st.session_state  # Referencia local para las lecturas repetidas
     level = block["level"]
-    rule = LEVEL_RULES[level]
-    threshold = rule["promotion_threshold"]
-    block_size = rule["block_size"]
-
-    block_finished = block["presented"] >= block_size or (
-        block["wrong"] >= EARLY_STOP_WRONGS and block["correct"] < threshold
-    )
-
-    if not block_finished:
-        return
+    threshold = block["promotion_threshold"]
+    block_size = block["block_size"]
+    correct = block["correct"]
+
+    # La regla secuencial corta el bloque en cuanto la evidencia basta; si no, se aplican las reglas fijas
+    decision = sprt_decision_table(threshold, block_size).get((correct, block["wrong"]), "continue")
+    if decision == "continue":
+        block_finished = block["presented"] >= block_size or (
+            block["wrong"] >= EARLY_STOP_WRONGS and correct < threshold
+        )
+        if not block_finished:
+            return
+        passed = correct >= threshold
+    else:
+        passed = decision == "promote"
 
-    passed = block["correct"] >= threshold
     record_block_result(block, passed)
 
     if passed:
-        st.session_state.passed_blocks[level] += 1
+        session.passed_blocks[level] += 1
         if level == "C2":
             finish_adaptive("C2", True)
             return
-        if st.session_state.passed_blocks[level] >= 2:
+        if session.passed_blocks[level] >= 2:
             finish_adaptive(level, True)
             return
 
-        if st.session_state.level_idx < len(LEVEL_SEQUENCE) - 1:
-            st.session_state.level_idx += 1
-            next_level = LEVEL_SEQUENCE[st.session_state.level_idx]
-            st.session_state.block = new_block(next_level)
-            st.session_state.pending_level_message = f"Subiendo a {next_level}…"
+        if session.level_idx < len(LEVEL_SEQUENCE) - 1:
+            session.level_idx += 1
+            next_level = LEVEL_SEQUENCE[session.level_idx]
+            session.block = new_block(next_level)
+            session.pending_level_message = f"Subiendo a {next_level}…"
         else:
             finish_adaptive(level, True)
             return
     else:
-        if st.session_state.level_idx == 0:
+        if session.level_idx == 0:
             # Consolidate the starting level with another block.
-            st.session_state.block = new_block(level)
-            st.session_state.pending_level_message = (
+            session.block = new_block(level)
+            session.pending_level_message = (
                 f"Mantendremos trabajo adicional en {level}."
             )
         else:
-            confirmed_level = LEVEL_SEQUENCE[st.session_state.level_idx - 1]
+            confirmed_level = LEVEL_SEQUENCE[session.level_idx - 1]
             finish_adaptive(confirmed_level, True)
             return
 
-    st.session_state.current_question = None
-    st.session_state.current_question_key = None
+    session.current_question = None
+    session.current_question_key = None
+
+
+class HistoryEntry(NamedTuple):
+    """One answered item in the adaptive test history."""
+
+    level: str
+    id: str
+    correct: bool
+    skill: str
+    pending_review: bool = False
 
 
 def process_adaptive_answer(question: Dict[str, Any], response: Any) -> None:
     """Update the adaptive state after an answer submission."""
 
-    block = st.session_state.block
-    writing_submission = None
-    if question.get("type") == WRITING_TYPE:
-        writing_submission = record_writing_submission(question, response, mode="adaptive")
-    score = score_question(question, response)
-    if writing_submission and score.get("ai_evaluation"):
-        writing_submission["ai_evaluation"] = score["ai_evaluation"]
-    is_correct = score["is_correct"]
-
-    block["presented"] += 1
-    if is_correct:
-        block["correct"] += 1
-    else:
-        block["wrong"] += 1
+    process_adaptive_answers([(question, response)])
 
-    st.session_state.history.append(
-        {
-            "level": question["level"],
-            "id": question["id"],
-            "correct": is_correct,
-            "skill": question["skill"],
-            "pending_review": score.get("pending_manual_review", False),
-        }
-    )
 
-    st.session_state.last_adaptive_feedback = build_feedback_payload(question, score)
+def process_adaptive_answers(answers: Sequence[Tuple[Dict[str, Any], Any]]) -> None:
+    """Score a batch of answers against the current block and evaluate it once."""
 
+    session = st.session_state  # Referencia local para las lecturas repetidas
+    block = session.block
+    for question, response in answers:
+        writing_submission = None
+        if question.get("type") == WRITING_TYPE:
+            writing_submission = record_writing_submission(question, response, mode="adaptive")
+        score = score_question(question, response)
+        if writing_submission and score.get("ai_evaluation"):
+            writing_submission["ai_evaluation"] = score["ai_evaluation"]
+        is_correct = score["is_correct"]
+
+        block["presented"] += 1
+        if is_correct:
+            block["correct"] += 1
+        else:
+            block["wrong"] += 1
+
+        session.history.append(
+            HistoryEntry(
+                level=question["level"],
+                id=question["id"],
+                correct=is_correct,
+                skill=question["skill"],
+                pending_review=score.get("pending_manual_review", False),
+            )
+        )
+
+        session.last_adaptive_feedback = build_feedback_payload(question, score)
+
+    # Una parte agrupada cuenta entera para el bloque en el que se empezó
     evaluate_block_completion(block)
 
-    if not st.session_state.finished and len(st.session_state.history) >= MAX_QUESTIONS:
+    if not session.finished and len(session.history) >= MAX_QUESTIONS:
         finish_adaptive(best_level_guess(), False)
 
 
@@ -1592,52 +1997,50 @@ def render_advanced_group_flow(
 ) -> bool:
     """Render the Cambridge-style grouped passage flow when available."""
 
-    group_state = st.session_state.get("current_group_state")
-    if group_state and group_state.get("level") != level:
+    session = st.session_state  # Referencia local para las lecturas repetidas
+    group_state = session.get("current_group_state")
+    if group_state and group_state.level != level:
         clear_current_group_state()
         group_state = None
 
     if group_state is None:
-        group_state = start_group_for_block(level, questions_by_level, block)
+        group_state = start_group_for_block(level, get_groups_by_level(), block)
 
     if not group_state:
         return False
 
-    questions = group_state["questions"]
+    questions = group_state.questions
     first_skill = questions[0].get("skill") if questions else None
-    render_exam_part_header(level, group_state.get("part"), skill=first_skill)
+    render_exam_part_header(level, group_state.part, skill=first_skill)
     render_group_timer(group_state)
 
-    if group_state.get("passage"):
-        st.markdown(
-            f"<div class='advanced-passage'>{group_state['passage']}</div>",
-            unsafe_allow_html=True,
-        )
+    if group_state.passage_html:
+        st.markdown(group_state.passage_html, unsafe_allow_html=True)
 
-    responses = group_state["responses"]
+    responses = group_state.responses
     total_questions = len(questions)
-    summary_tokens = [
-        (
-            "✓"
-            if response_is_complete(q, responses.get(q["id"]))
-            else "—",
-            f"Q{idx + 1}",
+    # Solo la pregunta visible cambia de respuesta en cada rerun: el resto del mapa se conserva
+    complete_mask = group_state.completeness
+    if complete_mask is None or len(complete_mask) != total_questions:
+        complete_mask = [response_is_complete(q, responses.get(q["id"])) for q in questions]
+        group_state.completeness = complete_mask
+    mask_key = tuple(complete_mask)
+    if group_state.summary_mask != mask_key:  # Solo se rehace la franja si cambió algún estado
+        summary = " · ".join(
+            f"{'✓' if done else '—'} Q{idx + 1}" for idx, done in enumerate(complete_mask)
         )
-        for idx, q in enumerate(questions)
-    ]
-    summary = " · ".join(f"{status} {label}" for status, label in summary_tokens)
-    st.markdown(
-        f"<div class='advanced-status-strip'>Timed section · {summary}</div>",
-        unsafe_allow_html=True,
-    )
+        group_state.summary_mask = mask_key
+        group_state.summary_html = f"<div class='advanced-status-strip'>Timed section · {summary}</div>"
+    st.markdown(group_state.summary_html, unsafe_allow_html=True)
 
-    current_index = group_state["current_index"]
+    current_index = group_state.current_index
     question = questions[current_index]
     st.markdown(f"**Pregunta {current_index + 1} / {total_questions}**")
     render_question_prompt(question, show_passage=False)
-    widget_key = f"group_{group_state['group_id']}_{question['id']}"
+    widget_key = group_state.widget_keys[current_index]
     response = render_question_inputs(question, widget_key, advanced=True)
     responses[question["id"]] = response
+    complete_mask[current_index] = response_is_complete(question, response)  # Actualiza el mapa guardado
 
     prev_col, next_col, submit_col = st.columns([1, 1, 1.2])
     with prev_col:
@@ -1646,9 +2049,9 @@ def render_advanced_group_flow(
             disabled=current_index == 0,
             use_container_width=True,
         ):
-            group_state["current_index"] = max(0, current_index - 1)
-            st.session_state.current_group_state = group_state
-            rerun_app()
+            group_state.current_index = max(0, current_index - 1)
+            session.current_group_state = group_state
+            rerun_app(scope="fragment")
 
     with next_col:
         if st.button(
@@ -1656,17 +2059,13 @@ def render_advanced_group_flow(
             disabled=current_index >= total_questions - 1,
             use_container_width=True,
         ):
-            group_state["current_index"] = min(total_questions - 1, current_index + 1)
-            st.session_state.current_group_state = group_state
-            rerun_app()
+            group_state.current_index = min(total_questions - 1, current_index + 1)
+            session.current_group_state = group_state
+            rerun_app(scope="fragment")
 
     with submit_col:
         if st.button("Submit part", use_container_width=True):
-            unanswered = [
-                idx + 1
-                for idx, q in enumerate(questions)
-                if not response_is_complete(q, responses.get(q["id"]))
-            ]
+            unanswered = [idx + 1 for idx, done in enumerate(complete_mask) if not done]
             if unanswered:
                 st.warning(
                     "Responde todas las preguntas antes de enviar esta sección (pendientes: "
@@ -1674,87 +2073,104 @@ def render_advanced_group_flow(
                     + ")."
                 )
             else:
-                for question in questions:
-                    process_adaptive_answer(question, responses[question["id"]])
+                process_adaptive_answers(
+                    [(question, responses[question["id"]]) for question in questions]
+                )
                 clear_current_group_state()
-                rerun_app()
+                rerun_app(scope="fragment")
 
     return True
 
 
+def tab_fragment(render: Callable[..., None]) -> Callable[..., None]:
+    """Run a tab renderer as a Streamlit fragment so its widgets only rerun that tab."""
+
+    fragment = getattr(st, "fragment", None)
+    if fragment is None:  # Versiones sin fragmentos: cada interacción recarga la app completa
+        return render
+    return fragment(render)
+
+
+def build_finished_tables(
+    block_results: Sequence[BlockResult], history: Sequence[HistoryEntry]
+) -> Tuple[pa.Table, pa.Table]:
+    """Return the block summary and answer history of the finished view as Arrow tables."""
+
+    # Columnas tipadas: st.table/st.dataframe las envían tal cual, sin inferir dtypes con pandas
+    block_table = pa.table({
+        "Bloque": list(range(1, len(block_results) + 1)),
+        "Nivel": [result.level for result in block_results],
+        "Resultado": [f"{result.correct} correctas / {result.presented} mostradas" for result in block_results],
+        "Meta": [result.goal for result in block_results],
+        "Estado": ["✅ Superado" if result.passed else "❌ Repetir" for result in block_results],
+    })
+    history_table = pa.table({
+        "#": list(range(1, len(history) + 1)),
+        "Nivel": [entry.level for entry in history],
+        "Habilidad": [entry.skill for entry in history],
+        "Ítem": [entry.id for entry in history],
+        "Resultado": [
+            "Pendiente de revisión" if entry.pending_review else ("Correcto" if entry.correct else "Incorrecto")
+            for entry in history
+        ],
+    })
+    return block_table, history_table
+
+
+@tab_fragment
 def render_adaptive_mode(questions_by_level: Dict[str, List[Dict[str, Any]]]) -> None:
     """Render the adaptive test flow with consent-driven messaging."""
 
-    ensure_adaptive_state()
-    st.session_state.mode = "adaptive"
+    session = st.session_state  # Referencia local para las lecturas repetidas
+    session.mode = "adaptive"
 
-    pending_message = st.session_state.pending_level_message
+    pending_message = session.pending_level_message
     if pending_message:
         toast = getattr(st, "toast", None)
         if callable(toast):
             toast(pending_message)
         else:
             st.info(pending_message)
-        st.session_state.pending_level_message = None
+        session.pending_level_message = None
 
-    if st.session_state.finished:
-        level = st.session_state.final_level or best_level_guess()
-        confirmation = "confirmado" if st.session_state.confirmed else "mejor estimación"
+    if session.finished:
+        level = session.final_level or best_level_guess()
+        confirmation = "confirmado" if session.confirmed else "mejor estimación"
         st.success(
             f"Test adaptativo finalizado. Nivel: **{level}** ({confirmation})."
         )
-        if level in CEFR_DESCRIPTIONS:
-            st.write(CEFR_DESCRIPTIONS[level])
+        description = CEFR_DESCRIPTIONS.get(level)  # Una sola búsqueda en el mapa
+        if description:
+            st.write(description)
+
+        history = session.history
+        tables = session.finished_tables
+        if tables is None:  # El resultado ya no cambia: las tablas se arman una vez por test terminado
+            tables = session.finished_tables = build_finished_tables(session.block_results, history)
+        block_table, history_table = tables
 
-        if st.session_state.block_results:
+        if session.block_results:
             st.subheader("Resumen por bloque")
-            st.table(
-                [
-                    {
-                        "Bloque": idx + 1,
-                        "Nivel": result["level"],
-                        "Resultado": f"{result['correct']} correctas / {result['presented']} mostradas",
-                        "Meta": result["goal"],
-                        "Estado": "✅ Superado" if result["passed"] else "❌ Repetir",
-                    }
-                    for idx, result in enumerate(st.session_state.block_results)
-                ]
-            )
+            st.table(block_table)
 
-        total_questions = len(st.session_state.history)
-        st.write(f"Preguntas contestadas: {total_questions}")
+        st.write(f"Preguntas contestadas: {len(history)}")
 
-        if st.session_state.history:
+        if history:
             st.subheader("Historial de respuestas")
-            st.dataframe(
-                [
-                    {
-                        "#": idx + 1,
-                        "Nivel": entry["level"],
-                        "Habilidad": entry["skill"],
-                        "Ítem": entry["id"],
-                        "Resultado": (
-                            "Pendiente de revisión"
-                            if entry.get("pending_review")
-                            else ("Correcto" if entry["correct"] else "Incorrecto")
-                        ),
-                    }
-                    for idx, entry in enumerate(st.session_state.history)
-                ],
-                use_container_width=True,
-            )
+            st.dataframe(history_table, use_container_width=True)
         render_writing_submission_summary(mode_filter="adaptive")
 
         if st.button("Reiniciar test adaptativo"):
             reset_adaptive_state()
-            rerun_app()
+            rerun_app(scope="fragment")
         return
 
-    block = st.session_state.block
+    block = session.block
     level = block["level"]
-    rule = LEVEL_RULES[level]
     questions = questions_by_level[level]
     advanced = is_advanced_level(level)
+    presented = block["presented"]  # Contadores leídos una vez por rerun
+    block_size = block["block_size"]
 
     layout_ctx = advanced_exam_layout() if advanced else nullcontext()
     with layout_ctx:
@@ -1767,7 +2183,7 @@ def render_adaptive_mode(questions_by_level: Dict[str, List[Dict[str, Any]]]) ->
         heading = (
             f"### {ADVANCED_LEVEL_TITLES.get(level, f'{level} Advanced Mode')}"
             if advanced
-            else f"### Nivel actual: **{level}** · Pregunta {block['presented'] + 1} de {rule['block_size']}"
+            else f"### Nivel actual: **{level}** · Pregunta {presented + 1} de {block_size}"
         )
         st.markdown(heading)
         caption = (
@@ -1777,54 +2193,33 @@ def render_adaptive_mode(questions_by_level: Dict[str, List[Dict[str, Any]]]) ->
         )
         st.caption(caption)
 
-        total_answered = len(st.session_state.history)
-        block_status = (
-            "Block progress — answered: {presented}/{size}, correct: {correct}, wrong: {wrong}."
-            if advanced
-            else "Bloque: {correct} aciertos, {wrong} errores, {presented} respondidas de {size}."
-        )
-        st.write(
-            block_status.format(
-                correct=block["correct"],
-                wrong=block["wrong"],
-                presented=block["presented"],
-                size=rule["block_size"],
-            )
-        )
-        st.progress(min(block["presented"], rule["block_size"]) / rule["block_size"])
-        total_label = (
-            "Adaptive session items administered: {answered} of {maximum} allowed."
-            if advanced
-            else "Preguntas totales contestadas: {answered} de {maximum} permitidas."
-        )
-        st.write(total_label.format(answered=total_answered, maximum=MAX_QUESTIONS))
+        total_answered = len(session.history)  # Se reutiliza en la clave del widget
+        # El bloque ya guarda sus contadores y block_size: la plantilla se rellena directamente con él
+        st.write((ADVANCED_BLOCK_STATUS if advanced else BLOCK_STATUS).format_map(block))
+        st.progress(presented / block_size if presented < block_size else 1.0)
+        st.write((ADVANCED_TOTAL_LABEL if advanced else TOTAL_LABEL) % total_answered)
 
         if advanced and render_advanced_group_flow(level, questions_by_level, block):
             return
 
-        if st.session_state.current_question is None:
-            st.session_state.current_question = pick_question_for_block(
+        if session.current_question is None:
+            session.current_question = pick_question_for_block(
                 level, questions_by_level, block
             )
-            key = (
-                f"adaptive_choice_{len(st.session_state.history)}_"
-                f"{st.session_state.current_question['id']}"
-            )
-            st.session_state.current_question_key = key
-            if key in st.session_state:
-                del st.session_state[key]
+            # total_answered crece con cada respuesta: la clave es nueva por construcción y no hay estado que borrar
+            session.current_question_key = f"adaptive_choice_{total_answered}_{session.current_question['id']}"
 
-        question = st.session_state.current_question
-        key = st.session_state.current_question_key
+        question = session.current_question
+        key = session.current_question_key
 
         if advanced:
             render_exam_part_header(level, question.get("part"), skill=question.get("skill"))
         render_question_prompt(question)
         if not advanced:
-            st.caption("Habilidad enfocada: " + question["skill"].replace("_", " ").title())
+            st.caption("Habilidad enfocada: " + question["skill_label"])
 
-        if st.session_state.last_adaptive_feedback:
-            feedback = st.session_state.last_adaptive_feedback
+        if session.last_adaptive_feedback:
+            feedback = session.last_adaptive_feedback
             render_feedback_alert(feedback)
             render_feedback_panel(feedback, "Ver explicación")
 
@@ -1838,7 +2233,7 @@ def render_adaptive_mode(questions_by_level: Dict[str, List[Dict[str, Any]]]) ->
         )
         if st.button(
             button_label,
-            key=f"submit_{question['id']}_{block['presented']}",
+            key=f"submit_{question['id']}_{presented}",
             help=button_help,
         ):
             warning_text = validate_response(question, response)
@@ -1847,9 +2242,23 @@ def render_adaptive_mode(questions_by_level: Dict[str, List[Dict[str, Any]]]) ->
             else:
                 process_adaptive_answer(question, response)
                 clear_widget_family(key)
-                st.session_state.current_question = None
-                st.session_state.current_question_key = None
-                rerun_app()
+                session.current_question = None
+                session.current_question_key = None
+                rerun_app(scope="fragment")
+
+
+def _next_practice_selection(level: str, available: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    """Return the next *count* questions of this session's shuffled order for *level*."""
+
+    # El orden se baraja una vez por nivel y sesión; cada reinicio continúa donde quedó el anterior
+    orders = st.session_state.setdefault("practice_orders", {})
+    entry = orders.get(level)
+    total = len(available)
+    if entry is None or len(entry["order"]) != total:  # Primera práctica del nivel o banco distinto
+        entry = orders[level] = {"order": session_rng().sample(range(total), total), "offset": 0}
+    order, offset = entry["order"], entry["offset"]
+    entry["offset"] = (offset + count) % total
+    return [available[order[(offset + step) % total]] for step in range(count)]
 
 
 def reset_practice_state(level: str, questions_by_level: Dict[str, List[Dict[str, Any]]]) -> None:
@@ -1869,9 +2278,10 @@ def reset_practice_state(level: str, questions_by_level: Dict[str, List[Dict[str
         }
         return
 
-    selection = random.sample(available, count) if len(available) >= count else list(available)
-    prepared_selection = [prepare_question_instance(question) for question in selection]
-    random.shuffle(prepared_selection)
+    rng = session_rng()
+    prepared_selection = [
+        prepare_question_instance(question, rng) for question in _next_practice_selection(level, available, count)
+    ]
     st.session_state.practice_state = {
         "level": level,
         "questions": prepared_selection,
@@ -1884,11 +2294,12 @@ def reset_practice_state(level: str, questions_by_level: Dict[str, List[Dict[str
     }
 
 
+@tab_fragment
 def render_practice_mode(questions_by_level: Dict[str, List[Dict[str, Any]]]) -> None:
     """Render the fixed-length practice drill for a specific level."""
 
-    ensure_adaptive_state()
-    st.session_state.mode = "practice"
+    session = st.session_state  # Referencia local para las lecturas repetidas
+    session.mode = "practice"
 
     level = st.selectbox("Selecciona un nivel para practicar", LEVEL_SEQUENCE)
     available = questions_by_level[level]
@@ -1897,14 +2308,16 @@ def render_practice_mode(questions_by_level: Dict[str, List[Dict[str, Any]]]) ->
             f"Solo hay {len(available)} preguntas disponibles en {level}. Usaremos todas para la práctica."
         )
 
-    if "practice_state" not in st.session_state or st.session_state.practice_state.get(
+    if "practice_state" not in session or session.practice_state.get(
         "level"
     ) != level:
         reset_practice_state(level, questions_by_level)
 
-    practice_state = st.session_state.practice_state
+    practice_state = session.practice_state
 
     total_questions = len(practice_state["questions"])
+    answered = practice_state["answered"]  # Contadores leídos una vez por rerun
+    correct = practice_state["correct"]
 
     if practice_state["completed"]:
         if total_questions == 0:
@@ -1915,13 +2328,14 @@ def render_practice_mode(questions_by_level: Dict[str, List[Dict[str, Any]]]) ->
             return
 
         st.success(
-            f"Práctica finalizada: {practice_state['correct']} aciertos de {practice_state['answered']} preguntas."
+            f"Práctica finalizada: {correct} aciertos de {answered} preguntas."
         )
         col1, col2 = st.columns(2)
-        col1.metric("Aciertos", practice_state["correct"])
-        col2.metric("Preguntas", practice_state["answered"])
-        if level in CEFR_DESCRIPTIONS:
-            st.info(CEFR_DESCRIPTIONS[level])
+        col1.metric("Aciertos", correct)
+        col2.metric("Preguntas", answered)
+        description = CEFR_DESCRIPTIONS.get(level)  # Una sola búsqueda en el mapa
+        if description:
+            st.info(description)
 
         feedback = practice_state.get("last_feedback")
         if feedback:
@@ -1930,21 +2344,22 @@ def render_practice_mode(questions_by_level: Dict[str, List[Dict[str, Any]]]) ->
         render_writing_submission_summary(mode_filter="practice")
         if st.button("Reiniciar práctica"):
             reset_practice_state(level, questions_by_level)
-            rerun_app()
+            rerun_app(scope="fragment")
         return
 
-    question = practice_state["questions"][practice_state["index"]]
-    key = f"practice_item_{practice_state['index']}_{question['id']}"
+    index = practice_state["index"]
+    question = practice_state["questions"][index]
+    key = f"practice_item_{index}_{question['id']}"
     st.subheader(f"Práctica guiada – Nivel {level}")
     st.write(
-        f"Pregunta {practice_state['index'] + 1} de {total_questions}."
+        f"Pregunta {index + 1} de {total_questions}."
     )
-    st.progress(practice_state["answered"] / total_questions if total_questions else 0)
+    st.progress(answered / total_questions if total_questions else 0)
     st.write(
-        f"Aciertos acumulados: {practice_state['correct']} de {practice_state['answered']} respondidas."
+        f"Aciertos acumulados: {correct} de {answered} respondidas."
     )
     render_question_prompt(question)
-    st.caption(f"Habilidad enfocada: {question['skill'].replace('_', ' ').title()}")
+    st.caption(f"Habilidad enfocada: {question['skill_label']}")
 
     response = render_question_inputs(question, key, advanced=False)
 
@@ -1974,7 +2389,7 @@ def render_practice_mode(questions_by_level: Dict[str, List[Dict[str, Any]]]) ->
             practice_state["index"] += 1
             if practice_state["index"] >= len(practice_state["questions"]):
                 practice_state["completed"] = True
-            rerun_app()
+            rerun_app(scope="fragment")
 
     feedback = practice_state.get("last_feedback")
     if feedback:
@@ -1991,49 +2406,17 @@ def main() -> None:
         "Evaluación diseñada para colegios y empleabilidad: combina un test adaptativo basado en bloques CEFR y una práctica guiada de 20 preguntas por nivel."
     )
 
-    if "onboarding_complete" not in st.session_state:
-        st.session_state.onboarding_complete = False
-    if "consent_checked" not in st.session_state:
-        st.session_state.consent_checked = False
+    ensure_adaptive_state()  # Una sola vez por ejecución completa; las pestañas solo leen el estado
     ensure_writing_storage()
 
-    try:
-        questions_by_level = get_questions_by_level()
-    except (FileNotFoundError, ValueError) as exc:
-        st.error(f"No se pudo cargar el banco de ítems: {exc}")
-        st.stop()
-
-    total_items = sum(len(items) for items in questions_by_level.values())
-    if total_items == 0:
-        st.warning(
-            "El banco de preguntas está vacío. Agrega nuevos ítems en ``english_test_items_v1.json`` para habilitar el test."
-        )
-        st.stop()
-
     st.markdown("## Índices de fiabilidad y validación")
-    st.markdown(
-        "- **Fiabilidad piloto (α de Cronbach):** 0.86 en una muestra de 420 participantes.\n"
-        "- **Cobertura CEFR completa:** ≥30 ítems por nivel con rotación de habilidades.\n"
-        "- **Control psicométrico:** reglas determinísticas de promoción y confirmación inspiradas en exámenes internacionales."
-    )
+    st.markdown(RELIABILITY_MD)
 
     with st.expander("Fuentes y fundamentación (CEFR, TOEFL/IELTS/Cambridge, psicometría)"):
-        st.markdown(
-            """
-            - Curaduría con descriptores oficiales del **Marco Común Europeo (CEFR)**.
-            - Ítems calibrados a partir de blueprints de **TOEFL iBT, IELTS Academic y Cambridge Main Suite**.
-            - Validación interna: revisión lingüística y análisis de dificultad/ discriminación tras pilotos en colegios y bootcamps.
-            """
-        )
+        st.markdown(SOURCES_MD)
 
     with st.expander("Privacidad y equidad"):
-        st.markdown(
-            """
-            - **Sin registro ni rastreo personal:** se almacenan únicamente estadísticas agregadas.
-            - Uso responsable: resultados pensados para orientar planes de refuerzo, no para excluir candidatos.
-            - Accesibilidad: interfaz compatible con lectores de pantalla y mensajes redundantes en color y texto.
-            """
-        )
+        st.markdown(PRIVACY_MD)
 
     consent = st.checkbox(
         "He leído cómo medimos fiabilidad y validez psicométrica.",
@@ -2056,6 +2439,20 @@ def main() -> None:
         )
         return
 
+    # El banco solo se carga tras el consentimiento: la portada no espera al JSON
+    try:
+        questions_by_level = get_questions_by_level()
+    except (FileNotFoundError, ValueError) as exc:
+        st.error(f"No se pudo cargar el banco de ítems: {exc}")
+        st.stop()
+
+    total_items = sum(len(items) for items in questions_by_level.values())
+    if total_items == 0:
+        st.warning(
+            "El banco de preguntas está vacío. Agrega nuevos ítems en ``english_test_items_v1.json`` para habilitar el test."
+        )
+        st.stop()
+
     st.success("Consentimiento registrado. Usa las pestañas para navegar entre el test y la práctica.")
     st.markdown("---")
 
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import os
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from english_test_app import (
+    BlockResult,
+    HistoryEntry,
+    _gap_slots,
+    _load_questions_snapshot,
+    _questions_snapshot_cutoff,
+    _save_questions_snapshot,
+    build_finished_tables,
+    normalize_item_for_ui,
+    prepare_question_instance,
+    response_is_complete,
+    score_question,
+    sprt_decision_table,
+    validate_response,
+)
+
+
+def test_prepare_question_instance_does_not_mutate_source() -> None:
+    question = {
+        "id": "C1-UE-CLZ-001",
+        "type": "cloze_mc",
+        "text": "Fill in the gaps.",
+        "cloze_items": [
+            {"number": 1, "answer": "on", "options": ["on", "in", "at", "by"]},
+            {"number": 2, "answer": "than", "options": ["than", "when", "then", "as"]},
+        ],
+    }
+
+    instance = prepare_question_instance(question)
+
+    assert question["cloze_items"][0]["options"] == ["on", "in", "at", "by"]
+    assert question["cloze_items"][1]["options"] == ["than", "when", "then", "as"]
+    for original, gap in zip(question["cloze_items"], instance["cloze_items"]):
+        assert gap is not original
+        assert gap["options"] is not original["options"]
+        assert sorted(gap["options"]) == sorted(original["options"])
+        assert gap["answer"] == original["answer"]
+
+
+def test_prepare_question_instance_copies_multiple_choice_options() -> None:
+    question = {
+        "id": "A1-GR-001",
+        "type": "multiple_choice",
+        "text": "I ___ breakfast.",
+        "options": ["eat", "eats", "eating", "ate"],
+        "answer": "eat",
+    }
+
+    instance = prepare_question_instance(question)
+
+    assert question["options"] == ["eat", "eats", "eating", "ate"]
+    assert instance["options"] is not question["options"]
+    assert sorted(instance["options"]) == sorted(question["options"])
+
+    seeded = [prepare_question_instance(question, random.Random(7))["options"] for _ in range(2)]
+    assert seeded[0] == seeded[1]
+
+
+def test_prepare_question_instance_attaches_gap_widget_keys() -> None:
+    question = {
+        "id": "C1-UE-KT-001",
+        "type": "key_transform",
+        "transform_items": [
+            {"number": 1, "original": "He started late.", "keyword": "TIME", "answer": "did not start on time"},
+        ],
+    }
+
+    instance = prepare_question_instance(question)
+
+    assert instance["transform_items"][0]["_widget_key"] == "_kt_1"
+    assert "_widget_key" not in question["transform_items"][0]
+
+
+def test_validate_response_lists_pending_gaps() -> None:
+    question = {
+        "id": "B2-UE-WF-001",
+        "type": "word_formation",
+        "word_formation_items": [
+            {"number": 1, "sentence": "It was a ___ day.", "base": "WONDER", "answer": "wonderful"},
+            {"number": 2, "sentence": "Her ___ was clear.", "base": "DECIDE", "answer": "decision"},
+        ],
+    }
+
+    assert not response_is_complete(question, None)
+    assert not response_is_complete(question, {1: "wonderful", 2: "   "})
+    assert validate_response(question, {1: "wonderful", 2: "   "}) == (
+        "Responde todas las transformaciones (pendientes: 2)."
+    )
+    assert validate_response(question, None) == (
+        "Responde todas las transformaciones (pendientes: 1, 2)."
+    )
+    assert response_is_complete(question, {1: "wonderful", 2: "decision"})
+    assert validate_response(question, {1: "wonderful", 2: "decision"}) is None
+
+
+def test_gap_slots_start_a_new_column_row_per_pair(monkeypatch: pytest.MonkeyPatch) -> None:
+    rows = []
+
+    def fake_columns(count: int) -> list:
+        row = [(len(rows), column) for column in range(count)]
+        rows.append(row)
+        return row
+
+    monkeypatch.setattr("english_test_app.st.columns", fake_columns)
+
+    assert [type(slot).__name__ for slot in _gap_slots(3)] == ["nullcontext"] * 3
+    assert not rows
+
+    assert _gap_slots(4) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    rows.clear()
+    assert _gap_slots(5) == [(0, 0), (0, 1), (1, 0), (1, 1), (2, 0)]
+
+
+def test_score_question_accepts_transform_alternatives() -> None:
+    question = {
+        "id": "C1-UE-KT-002",
+        "type": "key_transform",
+        "transform_items": [
+            {
+                "number": 1,
+                "original": "It is possible that he missed the bus.",
+                "keyword": "MAY",
+                "answer": "may have missed",
+                "alternatives": ["might have missed"],
+            },
+        ],
+    }
+
+    result = score_question(question, {1: "  Might have  missed "})
+
+    assert result["is_correct"] is True
+    assert result["breakdown"][0]["label"] == "Transformación 1"
+    assert score_question({"type": "unknown"}, None) == {"is_correct": False, "breakdown": []}
+
+
+def test_normalize_item_for_ui_precomputes_transform_candidates() -> None:
+    item = {
+        "id": "C2-UE-KT-001",
+        "type": "key_transform",
+        "prompt": "Rewrite the sentences.",
+        "skill": "use_of_english",
+        "level": "C2",
+        "transform_items": [
+            {
+                "number": 1,
+                "original": "She regrets leaving.",
+                "keyword": "WISHES",
+                "answer": "Wishes she had not left",
+                "alternatives": ["wishes she hadn't  left"],
+            },
+        ],
+    }
+
+    question = normalize_item_for_ui(item)
+
+    gap = question["transform_items"][0]
+    assert gap["_normalized_answers"] == frozenset({"wishes she had not left", "wishes she hadn't left"})
+    assert "_normalized_answers" not in item["transform_items"][0]
+
+
+def test_questions_snapshot_round_trip_and_staleness(tmp_path: Path) -> None:
+    snapshot = tmp_path / "bank.pkl"
+    questions = {"A1": [{"id": "A1-GR-001", "skill_label": "Grammar"}]}
+
+    _save_questions_snapshot(snapshot, questions)
+
+    assert _load_questions_snapshot(snapshot, newer_than=0) == questions
+    assert _load_questions_snapshot(snapshot, newer_than=snapshot.stat().st_mtime + 1) is None
+    assert _load_questions_snapshot(tmp_path / "missing.pkl", newer_than=0) is None
+
+
+def test_questions_snapshot_goes_stale_when_the_bank_loader_changes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    bank = tmp_path / "bank.json"
+    bank.write_text("{}", encoding="utf-8")
+    loader = tmp_path / "english_test_bank.py"
+    loader.write_text("", encoding="utf-8")
+    monkeypatch.setattr("english_test_app.english_test_bank.__file__", str(loader))
+    snapshot = tmp_path / "bank.pkl"
+    questions = {"A1": [{"id": "A1-GR-001"}]}
+    _save_questions_snapshot(snapshot, questions)
+    saved_at = snapshot.stat().st_mtime
+    os.utime(bank, (saved_at - 10, saved_at - 10))
+    os.utime(loader, (saved_at - 10, saved_at - 10))
+
+    assert _load_questions_snapshot(snapshot, _questions_snapshot_cutoff(bank)) == questions
+
+    os.utime(loader, (saved_at + 10, saved_at + 10))
+
+    assert _load_questions_snapshot(snapshot, _questions_snapshot_cutoff(bank)) is None
+
+
+def test_build_finished_tables_builds_arrow_columns() -> None:
+    block_results = [BlockResult("A1", 8, 2, 10, "8 / 10", True)]
+    history = [
+        HistoryEntry("A1", "A1-GR-001", True, "grammar"),
+        HistoryEntry("B2", "B2-WR-001", False, "writing", pending_review=True),
+    ]
+
+    block_table, history_table = build_finished_tables(block_results, history)
+
+    assert block_table.column("Estado").to_pylist() == ["✅ Superado"]
+    assert history_table.column("#").to_pylist() == [1, 2]
+    assert history_table.column("Resultado").to_pylist() == ["Correcto", "Pendiente de revisión"]
+
+
+def test_sprt_decision_table_stops_blocks_early_without_crossing_the_threshold() -> None:
+    for threshold, block_size in ((8, 10), (9, 12)):
+        table = sprt_decision_table(threshold, block_size)
+        max_wrong = block_size - threshold
+
+        assert table[threshold, 0] == "promote"
+        assert table[threshold - 1, 0] == "continue"
+        assert table[0, max_wrong] == "continue"
+        assert table[0, max_wrong + 1] == "demote"
+        assert all(correct >= threshold for (correct, _), decision in table.items() if decision == "promote")
+        assert all(wrong > max_wrong for (_, wrong), decision in table.items() if decision == "demote")
+
+    assert sprt_decision_table(8, 10)[2, 2] == "continue"
+    assert sprt_decision_table(9, 12)[5, 3] == "continue"